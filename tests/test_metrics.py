@@ -6,9 +6,9 @@ def test_metrics_window_behavior():
     metrics = Metrics()
 
     async def run_test():
-        await metrics.increment()
-        await metrics.increment()
-        await metrics.increment()
+        metrics.increment()
+        metrics.increment()
+        metrics.increment()
         rps_initial = await metrics.get_rps()
         await asyncio.sleep(1.1)
         rps_after = await metrics.get_rps()
@@ -23,9 +23,9 @@ def test_metrics_partial_window():
     metrics = Metrics()
 
     async def run_test():
-        await metrics.increment()
+        metrics.increment()
         await asyncio.sleep(0.6)
-        await metrics.increment()
+        metrics.increment()
         rps_mid = await metrics.get_rps()
         await asyncio.sleep(0.5)
         rps_late = await metrics.get_rps()
@@ -34,3 +34,23 @@ def test_metrics_partial_window():
     rps_mid, rps_late = asyncio.run(run_test())
     assert rps_mid == 2
     assert rps_late == 1
+
+
+def test_metrics_last_rps_snapshot():
+    metrics = Metrics()
+    assert metrics.last_rps == 0
+
+    async def run_test():
+        metrics.increment()
+        metrics.increment()
+        # increment() only counts; the snapshot refreshes on get_rps()
+        assert metrics.last_rps == 0
+        await metrics.get_rps()
+        after_increment = metrics.last_rps
+        await asyncio.sleep(1.1)
+        await metrics.get_rps()
+        return after_increment, metrics.last_rps
+
+    after_increment, after_window = asyncio.run(run_test())
+    assert after_increment == 2
+    assert after_window == 0
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from traffic_generator import (
+    TrafficGenerator,
+    Metrics,
+    ContainerConfig,
+    SiteMap,
+    PathDefinition,
+    THINK_TIME_TICK,
+    next_think_tick,
+    sleep_until,
+)
+
+
+def make_generator(rate_limit):
+    config = ContainerConfig(
+        **{
+            "Traffic Generator URL": "http://example.com",
+            "XFF Header Name": "X-Forwarded-For",
+            "Rate Limit": rate_limit,
+            "Simulated Users": 1,
+            "Minimum Session Length": 1,
+            "Maximum Session Length": 1,
+        }
+    )
+    site_map = SiteMap(
+        has_auth=False,
+        paths=[PathDefinition(method="GET", paths=["/"], traffic_type="web")],
+    )
+    return TrafficGenerator(config, site_map, Metrics())
+
+
+def test_token_bucket_spaces_requests():
+    tg = make_generator(20)
+
+    async def run_test():
+        start = time.monotonic()
+        # One second of burst is available up front, the rest waits for refill
+        await asyncio.gather(*(tg._acquire_token() for _ in range(30)))
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run_test())
+    assert 0.4 <= elapsed < 1.0
+
+
+def test_token_bucket_disabled_when_zero():
+    tg = make_generator(0)
+
+    async def run_test():
+        start = time.monotonic()
+        for _ in range(100):
+            await tg._acquire_token()
+        return time.monotonic() - start
+
+    assert asyncio.run(run_test()) < 0.1
+
+
+def test_think_time_wakeups_share_a_deadline():
+    async def run_test():
+        loop = asyncio.get_running_loop()
+        deadlines = []
+        call_at = loop.call_at
+
+        def recording_call_at(when, *args):
+            deadlines.append(when)
+            return call_at(when, *args)
+
+        loop.call_at = recording_call_at
+        try:
+            # 50 users whose raw deadlines all fall inside the same tick
+            start = next_think_tick(loop.time()) + 0.05 + THINK_TIME_TICK / 10
+            await asyncio.gather(
+                *(
+                    sleep_until(
+                        loop, next_think_tick(start + i * THINK_TIME_TICK / 100)
+                    )
+                    for i in range(50)
+                )
+            )
+        finally:
+            del loop.call_at
+        return deadlines
+
+    deadlines = asyncio.run(run_test())
+    assert len(deadlines) == 50
+    assert len(set(deadlines)) == 1
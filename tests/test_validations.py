@@ -1,3 +1,6 @@
+import asyncio
+import socket
+
 import pytest
 from pydantic import ValidationError
 
@@ -7,6 +10,7 @@ from traffic_generator import (
     PathDefinition,
     Metrics,
     TrafficGenerator,
+    compile_path_pattern,
 )
 
 
@@ -61,3 +65,105 @@ def test_match_path_variations():
     assert tg.match_path("/users/123/profile", "/users/@id/profile") is True
     assert tg.match_path("/users/123/profile", "/users/@id") is False
     assert tg.match_path("/posts/1", "/users/@id") is False
+
+
+def test_compiled_path_pattern_matches_match_path():
+    tg = TrafficGenerator(minimal_config(), minimal_sitemap(), Metrics())
+    patterns = ["/users/@id", "/users/@id/profile", "/@a/@b", "/", "/a.b/@x"]
+    paths = [
+        "/users/123",
+        "/users/123/",
+        "/users//profile",
+        "/posts/1",
+        "/a/",
+        "",
+        "/x/y",
+        "/axb/1",
+        "/a.b/1",
+        "/b?x=1",
+        "//users/1//",
+    ]
+    for pattern in patterns:
+        matcher = compile_path_pattern(pattern)
+        for path in paths:
+            expected = tg.match_path(path, pattern)
+            assert bool(matcher.fullmatch(path.strip("/"))) is expected, (pattern, path)
+
+
+def test_container_config_ipv6_dns_override():
+    cfg = minimal_config(**{"Traffic Generator DNS Override": "2001:db8::1"})
+    assert cfg.traffic_target_dns_override == "2001:db8::1"
+    with pytest.raises(ValidationError):
+        minimal_config(**{"Traffic Generator DNS Override": "2001:db8::zz"})
+
+    tg = TrafficGenerator(cfg, minimal_sitemap(), Metrics())
+    # The URL keeps the original host; the override is applied at resolution
+    assert tg.build_url("/x") == "http://example.com/x"
+
+    async def resolve():
+        resolver = tg.create_resolver()
+        try:
+            return await resolver.resolve("example.com", 80)
+        finally:
+            await resolver.close()
+
+    (result,) = asyncio.run(resolve())
+    assert result["host"] == "2001:db8::1"
+    assert result["family"] == socket.AF_INET6
+
+
+def test_build_request_url_matches_parsed_url():
+    from yarl import URL
+
+    for target, dns in [
+        ("http://example.com:8080", None),
+        ("https://example.com", "2001:db8::1"),
+    ]:
+        overrides = {"Traffic Generator URL": target}
+        if dns:
+            overrides["Traffic Generator DNS Override"] = dns
+        tg = TrafficGenerator(minimal_config(**overrides), minimal_sitemap(), Metrics())
+        for path in [
+            "/users/123",
+            "/b?x=al%20ice&y=2",
+            "/a b",
+            "/p%zz",
+            "/q#frag",
+            "/a/../b",
+            "/%41",
+            "/x/./y?q=1&r=a'b",
+        ]:
+            # Same target as the URL(str) parse static paths go through
+            built = tg.build_request_url(path)
+            assert str(URL(built)) == str(URL(tg.build_url(path))), path
+
+
+def test_generate_random_ip_stays_public(monkeypatch):
+    from ipaddress import IPv4Address, ip_network
+    import traffic_generator
+
+    tg = TrafficGenerator(minimal_config(), minimal_sitemap(), Metrics())
+    excluded = [ip_network(n) for n in traffic_generator.FAKE_IP_EXCLUDED_RANGES]
+
+    def check(ip):
+        addr = IPv4Address(ip)
+        assert 1 <= int(addr) >> 24 <= 223
+        assert 1 <= int(addr) & 0xFF <= 254
+        assert not any(addr in net for net in excluded), ip
+
+    for _ in range(2000):
+        check(tg.generate_random_ip())
+
+    # Both ends of the allowed space and the runs around every excluded range
+    total = traffic_generator.FAKE_IP_TOTAL
+    hosts = traffic_generator.FAKE_IP_HOSTS_PER_BLOCK
+    draws = [0, total - 1]
+    for offset in traffic_generator.FAKE_IP_BLOCK_OFFSETS[1:-1]:
+        draws += [offset * hosts - 1, offset * hosts]
+    for n in draws:
+        monkeypatch.setattr("random.randrange", lambda _, n=n: n)
+        check(tg.generate_random_ip())
+    monkeypatch.setattr("random.randrange", lambda _: 0)
+    assert tg.generate_random_ip() == "1.0.0.1"
+    monkeypatch.setattr("random.randrange", lambda _: total - 1)
+    assert tg.generate_random_ip() == "223.255.255.254"
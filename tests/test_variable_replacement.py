@@ -1,3 +1,4 @@
+import json
 from traffic_generator import (
     TrafficGenerator,
     Metrics,
@@ -5,11 +6,12 @@ from traffic_generator import (
     SiteMap,
     PathDefinition,
     VariableDefinition,
+    json_escape,
 )
 
 
-def test_replace_variables(monkeypatch):
-    config = ContainerConfig(
+def minimal_config():
+    return ContainerConfig(
         **{
             "Traffic Generator URL": "http://example.com",
             "XFF Header Name": "X-Forwarded-For",
@@ -19,6 +21,10 @@ def test_replace_variables(monkeypatch):
             "Maximum Session Length": 1,
         }
     )
+
+
+def test_replace_variables(monkeypatch):
+    config = minimal_config()
     site_map = SiteMap(
         has_auth=False,
         paths=[PathDefinition(method="GET", paths=["/"], traffic_type="web")],
@@ -44,3 +50,149 @@ def test_replace_variables(monkeypatch):
     assert replaced["url"] == "/user/123"
     assert replaced["info"]["age"] == "15"
     assert replaced["list"] == ["123", {"a": "15"}]
+
+
+def test_compiled_path_templates(monkeypatch):
+    config = minimal_config()
+    path_def = PathDefinition(
+        method="POST",
+        paths=["/user/@id/orders/@id", "/static"],
+        body='{"age": @age, "min": @age, "name": "@missing"}',
+        traffic_type="api",
+    )
+    site_map = SiteMap(
+        has_auth=False,
+        paths=[path_def],
+        variables={"age": VariableDefinition(type="range", value=[10, 20])},
+    )
+    tg = TrafficGenerator(config, site_map, Metrics())
+
+    assert path_def._path_segments[1] == ("/static",)
+
+    draws = iter([11, 12])
+    monkeypatch.setattr("random.randint", lambda a, b: next(draws))
+
+    # Undefined variables are kept; each defined variable is drawn once per render
+    assert tg.render_template(path_def._path_segments[0]) == "/user/@id/orders/@id"
+    assert tg.render_template(path_def._body_segments) == (
+        '{"age": 11, "min": 11, "name": "@missing"}'
+    )
+
+
+def test_auth_json_template_matches_dict_walk(monkeypatch):
+    config = minimal_config()
+    json_body = {
+        "user": "@user",
+        "n": {"pw": "p-@user", "tags": ["@user", 1, None, True]},
+        "@key": "x\n@user@user",
+    }
+    site_map = SiteMap(
+        has_auth=True,
+        auth={
+            "auth_method": "POST",
+            "auth_path": "/login",
+            "auth_type": "json_body",
+            "credentials": {"json_body": json_body},
+        },
+        paths=[PathDefinition(method="GET", paths=["/"], traffic_type="web")],
+        variables={"user": VariableDefinition(type="list", value=['%41"x'])},
+    )
+    tg = TrafficGenerator(config, site_map, Metrics())
+    monkeypatch.setattr("random.choice", lambda x: x[0])
+
+    assert tg._auth_json_template is not None
+    segments, fields = tg._auth_json_template
+    rendered = tg.render_template(segments, escape=json_escape, fields=fields)
+    assert json.loads(rendered) == tg._replace_variables_in_dict(json_body)
+
+    # Like the walk, every string field draws its own value; repeats within
+    # one string share it
+    json_body = {"a": "@n", "b": "@n-@n", "c": ["@n"]}
+    site_map = SiteMap(
+        has_auth=True,
+        auth={
+            "auth_method": "POST",
+            "auth_path": "/login",
+            "auth_type": "json_body",
+            "credentials": {"json_body": json_body},
+        },
+        paths=[PathDefinition(method="GET", paths=["/"], traffic_type="web")],
+        variables={"n": VariableDefinition(type="range", value=[1, 9])},
+    )
+    tg = TrafficGenerator(config, site_map, Metrics())
+    expected = {"a": "1", "b": "2-2", "c": ["3"]}
+
+    draws = iter([1, 2, 3])
+    monkeypatch.setattr("random.randint", lambda a, b: next(draws))
+    segments, fields = tg._auth_json_template
+    rendered = tg.render_template(segments, escape=json_escape, fields=fields)
+    assert json.loads(rendered) == expected
+
+    draws = iter([1, 2, 3])
+    assert tg._replace_variables_in_dict(json_body) == expected
+
+
+def test_no_variables_skips_substitution():
+    config = minimal_config()
+    site_map = SiteMap(
+        has_auth=False,
+        paths=[PathDefinition(method="GET", paths=["/u/@id"], traffic_type="web")],
+    )
+    tg = TrafficGenerator(config, site_map, Metrics())
+
+    assert tg.replace_variables("/u/@id") == "/u/@id"
+    data = {"a": "@id", "b": ["@x", {"c": "@y"}]}
+    assert tg._replace_variables_in_dict(data) is data
+    assert tg.render_template(site_map.paths[0]._path_segments[0]) == "/u/@id"
+
+
+def test_inverted_range_keeps_placeholder():
+    config = minimal_config()
+    site_map = SiteMap(
+        has_auth=False,
+        paths=[PathDefinition(method="GET", paths=["/u/@id"], traffic_type="web")],
+        variables={"id": VariableDefinition(type="range", value=[10, 1])},
+    )
+    tg = TrafficGenerator(config, site_map, Metrics())
+
+    # Logged and left unchanged, as _variable_value always did
+    assert tg.replace_variables("/u/@id") == "/u/@id"
+    assert tg.render_template(site_map.paths[0]._path_segments[0]) == "/u/@id"
+
+
+def test_auth_headers_only_substitute_custom_header_values():
+    import asyncio
+    import aiohttp
+
+    config = minimal_config()
+
+    class RecordingSession:
+        def __init__(self):
+            self.headers = None
+
+        def request(self, method, url, headers=None, **kwargs):
+            self.headers = headers
+            raise aiohttp.ClientError("not sent")
+
+    def sent_headers(auth_type, header):
+        site_map = SiteMap(
+            has_auth=True,
+            auth={
+                "auth_method": "POST",
+                "auth_path": "/login",
+                "auth_type": auth_type,
+                "credentials": {"header": header},
+            },
+            paths=[PathDefinition(method="GET", paths=["/"], traffic_type="web")],
+            variables={"word": VariableDefinition(type="list", value=["X"])},
+        )
+        tg = TrafficGenerator(config, site_map, Metrics())
+        session = RecordingSession()
+        assert asyncio.run(tg.perform_authentication(session, {})) is None
+        return session.headers
+
+    # basic/bearer tokens are sent verbatim, even if they look like a placeholder
+    token = {"Authorization": "Bearer ab@word"}
+    assert sent_headers("bearer", token)["Authorization"] == "Bearer ab@word"
+    assert sent_headers("basic", token)["Authorization"] == "Bearer ab@word"
+    assert sent_headers("custom_header", token)["Authorization"] == "Bearer abX"
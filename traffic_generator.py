@@ -2,23 +2,29 @@
 
 import asyncio
 import aiohttp
+import bisect
 import json
+import math
+import orjson
 import random
 import time
-import psutil
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Callable, Union, FrozenSet
 import logging
 import re
+import socket
+import struct
+from multidict import CIMultiDict
+from yarl import URL
 from pydantic import (
     BaseModel,
     Field,
     validator,
     RootModel,
     model_validator,
+    PrivateAttr,
 )  # Added model_validator
-from ipaddress import ip_address, AddressValueError
-from urllib.parse import urlparse, urlunparse, quote
-from collections import deque
+from ipaddress import IPv4Address, IPv4Network, IPv6Address
+from urllib.parse import urlparse, quote
 
 # Set up a dedicated logger for the traffic generator
 logger = logging.getLogger("Traffic Generator")
@@ -29,6 +35,7 @@ console_handler.setFormatter(formatter)
 logger.addHandler(console_handler)
 logger.propagate = True
 
+
 # -------------
 # Export so container_control can import them
 # -------------
@@ -38,6 +45,136 @@ __all__ = ["asyncio", "logger", "StartRequest", "TrafficGenerator", "Metrics"]
 # ---------------------------
 # Configuration Models
 # ---------------------------
+# Allowed values for the validators below, built once at import
+AUTH_TYPES = frozenset(
+    {"basic", "bearer", "body_params", "json_body", "query_params", "custom_header"}
+)
+TRAFFIC_TYPES = frozenset({"web", "api"})
+HTTP_METHODS = frozenset({"GET", "POST", "PUT", "DELETE", "HEAD", "PATCH", "OPTIONS"})
+VARIABLE_TYPES = frozenset({"list", "range"})
+
+# @variable placeholders in paths, bodies and header values
+VARIABLE_PATTERN = re.compile(r"@([a-zA-Z0-9_]+)")
+# Values containing anything else get URL-encoded...
+URL_UNSAFE_PATTERN = re.compile(r"[^a-zA-Z0-9._~-]")
+# ...unless they already start with a percent-escape
+PERCENT_ENCODED_PATTERN = re.compile(r"%[0-9a-fA-F]{2}")
+
+# Request targets yarl would leave exactly as written: only characters it
+# never requotes. Percent-escapes are excluded because yarl normalizes them
+# (e.g. %41 -> A), and dot-segments are checked separately.
+ENCODED_TARGET_PATTERN = re.compile(r"[A-Za-z0-9._~!$&'()*+,;=:@/?-]*")
+
+# Upper bound on template plans memoized for texts not known at load time
+TEMPLATE_PLAN_CACHE_SIZE = 8192
+
+# Think-time wakeups are snapped to this grid (seconds) on the loop clock
+THINK_TIME_TICK = 0.01
+
+
+def compile_template(text: str) -> Tuple[str, ...]:
+    """
+    Splits a template into alternating literal and variable-name segments:
+    even indexes are literal text, odd indexes are @variable names.
+    """
+    return tuple(VARIABLE_PATTERN.split(text))
+
+
+def json_escape(value: str) -> str:
+    """Escapes a value for splicing between the quotes of a JSON string."""
+    return orjson.dumps(value).decode()[1:-1]
+
+
+def compile_json_template(data: Any) -> Tuple[Tuple[str, ...], FrozenSet[int]]:
+    """
+    Serializes a JSON-like structure into a compile_template() tuple, plus
+    the indexes of the variable segments that open a new JSON string (pass
+    them as render_template's fields). Only string values are templated;
+    keys stay literal, even with an '@' in them. Substituted values must be
+    JSON-escaped (see json_escape).
+    """
+    segments = [""]
+    fields: List[int] = []
+
+    def walk(node: Any):
+        if isinstance(node, dict):
+            segments[-1] += "{"
+            for i, (key, value) in enumerate(node.items()):
+                segments[-1] += ("," if i else "") + orjson.dumps(key).decode() + ":"
+                walk(value)
+            segments[-1] += "}"
+        elif isinstance(node, list):
+            segments[-1] += "["
+            for i, item in enumerate(node):
+                if i:
+                    segments[-1] += ","
+                walk(item)
+            segments[-1] += "]"
+        elif isinstance(node, str):
+            parts = compile_template(node)
+            segments[-1] += '"' + json_escape(parts[0])
+            if len(parts) > 1:
+                fields.append(len(segments))
+            for j in range(1, len(parts), 2):
+                segments.append(parts[j])
+                segments.append(json_escape(parts[j + 1]))
+            segments[-1] += '"'
+        else:
+            try:
+                segments[-1] += orjson.dumps(node).decode()
+            except TypeError:
+                # orjson rejects e.g. integers wider than 64 bits; stdlib copes
+                segments[-1] += json.dumps(node)
+
+    walk(data)
+    return tuple(segments), frozenset(fields)
+
+
+def compile_path_pattern(pattern: str) -> "re.Pattern[str]":
+    """
+    Compiles a TrafficGenerator.match_path pattern: matched with fullmatch()
+    against a request path stripped of outer slashes, every '@...' segment
+    matches any single segment and the rest must be equal.
+    """
+    return re.compile(
+        "/".join(
+            "[^/]*" if part.startswith("@") else re.escape(part)
+            for part in pattern.strip("/").split("/")
+        )
+    )
+
+
+def ensure_leading_slash(path: str) -> str:
+    """Request paths are appended straight onto scheme://netloc."""
+    if path and not path.startswith("/"):
+        return "/" + path
+    return path
+
+
+def next_think_tick(when: float) -> float:
+    """Rounds a loop-clock deadline up to the shared THINK_TIME_TICK grid."""
+    return math.ceil(when / THINK_TIME_TICK) * THINK_TIME_TICK
+
+
+def _wake(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
+
+
+async def sleep_until(loop: asyncio.AbstractEventLoop, when: float):
+    """
+    Sleeps until an absolute loop.time() deadline. Unlike asyncio.sleep(),
+    which re-adds the delay to the current time, callers passing the same
+    deadline get the same timer deadline.
+    """
+    fut = loop.create_future()
+    handle = loop.call_at(when, _wake, fut)
+    try:
+        await fut
+    finally:
+        handle.cancel()
+
+
 class CredentialHeaders(BaseModel):
     Authorization: Optional[str] = None
 
@@ -63,23 +200,20 @@ class AuthConfig(BaseModel):
     auth_type: str
     credentials: Credentials
 
+    @validator("auth_path")
+    def normalize_auth_path(cls, v):
+        return ensure_leading_slash(v)
+
     @validator("auth_type")
     def validate_auth_type(cls, v):
-        allowed = [
-            "basic",
-            "bearer",
-            "body_params",
-            "json_body",
-            "query_params",
-            "custom_header",
-        ]
         # Ensure auth_type is not empty when AuthConfig is being validated
         # (which should only happen if has_auth is true, due to SiteMap validator)
         if not v:
             raise ValueError("auth_type cannot be empty when authentication is enabled")
-        if v.lower() not in allowed:
-            raise ValueError(f"auth_type must be one of {allowed}")
-        return v.lower()
+        v = v.lower()
+        if v not in AUTH_TYPES:
+            raise ValueError(f"auth_type must be one of {sorted(AUTH_TYPES)}")
+        return v
 
 
 class PathDefinition(BaseModel):
@@ -88,19 +222,34 @@ class PathDefinition(BaseModel):
     body: Optional[str] = None
     traffic_type: str
 
+    # Pre-split templates (see compile_template) so requests skip the regex
+    _path_segments: List[Tuple[str, ...]] = PrivateAttr(default_factory=list)
+    _body_segments: Optional[Tuple[str, ...]] = PrivateAttr(default=None)
+
+    @validator("paths")
+    def normalize_paths(cls, v):
+        return [ensure_leading_slash(p) for p in v]
+
     @validator("traffic_type")
     def validate_traffic_type(cls, v):
-        allowed = ["web", "api"]
-        if v.lower() not in allowed:
+        v = v.lower()
+        if v not in TRAFFIC_TYPES:
             raise ValueError("traffic_type must be either 'web' or 'api'")
-        return v.lower()
+        return v
 
     @validator("method")
     def validate_method(cls, v):
-        allowed_methods = ["GET", "POST", "PUT", "DELETE", "HEAD", "PATCH", "OPTIONS"]
-        if v.upper() not in allowed_methods:
-            raise ValueError(f"method must be one of {allowed_methods}")
-        return v.upper()
+        v = v.upper()
+        if v not in HTTP_METHODS:
+            raise ValueError(f"method must be one of {sorted(HTTP_METHODS)}")
+        return v
+
+    @model_validator(mode="after")
+    def compile_templates(self):
+        self._path_segments = [compile_template(p) for p in self.paths]
+        if self.body:
+            self._body_segments = compile_template(self.body)
+        return self
 
 
 class HeaderOverride(BaseModel):
@@ -114,10 +263,10 @@ class VariableDefinition(BaseModel):
 
     @validator("type")
     def validate_variable_type(cls, v):
-        allowed = ["list", "range"]
-        if v.lower() not in allowed:
-            raise ValueError(f"Variable type must be one of {allowed}")
-        return v.lower()
+        v = v.lower()
+        if v not in VARIABLE_TYPES:
+            raise ValueError(f"Variable type must be one of {sorted(VARIABLE_TYPES)}")
+        return v
 
 
 class SiteMap(BaseModel):
@@ -216,8 +365,14 @@ class ContainerConfig(BaseModel):
     def validate_dns_override(cls, v):
         if v is not None:
             try:
-                ip_address(v)
-            except AddressValueError:
+                # Parse with the matching class directly instead of letting
+                # ip_address() try IPv4 then IPv6. Both raise ValueError
+                # subclasses, so IPv6 failures are caught as well.
+                if ":" in v:
+                    IPv6Address(v)
+                else:
+                    IPv4Address(v)
+            except ValueError:
                 raise ValueError(
                     f"Invalid IP address provided for Traffic Generator DNS Override: {v}"
                 )
@@ -234,448 +389,563 @@ class StartRequest(BaseModel):
 # ---------------------------
 class Metrics:
     """
-    A rolling 1-second window of timestamps to compute instantaneous RPS.
+    A rolling 1-second window of per-millisecond request counts to compute
+    instantaneous RPS.
     """
 
-    def __init__(self):
-        self.lock = asyncio.Lock()
-        self.request_timestamps = deque()
+    WINDOW_MS = 1000
 
-    async def increment(self):
-        now = time.monotonic()
-        async with self.lock:
-            self.request_timestamps.append(now)
-            # Trim timestamps older than 1 second
-            while self.request_timestamps and (now - self.request_timestamps[0]) > 1:
-                self.request_timestamps.popleft()
+    def __init__(self):
+        # Ring of 1 ms buckets covering the last second, each stamped with the
+        # millisecond tick it counts. Only touched from the event loop thread,
+        # so no lock is needed.
+        self._counts = [0] * self.WINDOW_MS
+        self._ticks = [-1] * self.WINDOW_MS
+        # Last computed RPS. A plain attribute so other threads (the adapter's
+        # metrics endpoints) can read it without hopping onto the event loop.
+        self.last_rps = 0
+
+    def increment(self):
+        tick = int(time.monotonic() * 1000)
+        i = tick % self.WINDOW_MS
+        if self._ticks[i] == tick:
+            self._counts[i] += 1
+        else:
+            # Bucket still holds an older tick; reclaim it. Expired buckets are
+            # otherwise left alone and simply skipped by get_rps.
+            self._ticks[i] = tick
+            self._counts[i] = 1
 
     async def get_rps(self):
-        now = time.monotonic()
-        async with self.lock:
-            # Trim timestamps older than 1 second before calculating
-            while self.request_timestamps and (now - self.request_timestamps[0]) > 1:
-                self.request_timestamps.popleft()
-            return len(self.request_timestamps)
+        oldest = int(time.monotonic() * 1000) - self.WINDOW_MS
+        self.last_rps = sum(
+            count for tick, count in zip(self._ticks, self._counts) if tick > oldest
+        )
+        return self.last_rps
 
 
 # ---------------------------
 # Traffic Generator Classes
 # ---------------------------
+
+# User-agent and header tables, built once at import rather than for every
+# TrafficGenerator.
+
+# Expanded and more robust user-agents lists for web
+USER_AGENTS_WEB = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 12_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.6 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:102.0) Gecko/20100101 Firefox/102.0",
+    "Mozilla/5.0 (iPad; CPU OS 15_5 like Mac OS X) AppleWebKit/606.1.15 (KHTML, like Gecko) Version/15.0 Mobile/15E148 Safari/605.1.15",
+    "Mozilla/5.0 (Android 12; Mobile; rv:102.0) Gecko/102.0 Firefox/102.0",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/606.1.15 (KHTML, like Gecko) Version/15.6 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 13.5; rv:109.0) Gecko/20100101 Firefox/115.0",
+    "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/115.0",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36 Edg/116.0.1938.69",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.5 Safari/605.1.15",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0"
+    "Mozilla/5.0 (Linux; Android 13; Pixel 7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Mobile Safari/537.36",
+)
+
+# Expanded and more robust user-agents lists for API
+USER_AGENTS_API = (
+    "PostmanRuntime/7.29.0",
+    "Python-requests/2.27.1",
+    "curl/7.79.1",
+    "Go-http-client/1.1",
+    "Wget/1.20.3 (linux-gnu)",
+    "Apache-HttpClient/4.5.13 (Java/11.0.15)",
+    "axios/0.21.1 Node.js/v14.17.0",
+    "Java/1.8.0_281",
+    "libwww-perl/6.31",
+    "HTTPie/2.5.0",
+    "okhttp/4.9.1",
+    "Faraday v2.7.10",
+    "Dart/2.17 (dart:io)",
+    "Xamarin/3.0.0 (Xamarin.Android; Android 13; SDK 33)",
+    "Insomnia/2023.5.8",
+    "Nodejs-v16.16.0",
+    "Dalvik/2.1.0 (Linux; U; Android 13; SM-S918B Build/TP1A.220624.014)",
+    "aws-sdk-js-2.1395.0",
+    "Swift-URLSession",
+    "ruby rest-client/2.1.0",
+)
+
+HEADERS_WEB_OPTIONS = (
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+        "DNT": "1",
+    },
+    {
+        "Accept": "application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Accept-Language": "en-GB,en;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+        "DNT": "1",
+        "Sec-Fetch-Site": "none",
+        "Sec-Fetch-Mode": "navigate",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml",
+        "Accept-Language": "fr-FR,fr;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+        "Cache-Control": "no-cache",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
+        "Accept-Language": "de-DE,de;q=0.5",
+        "Connection": "keep-alive",
+        "Pragma": "no-cache",
+        "Sec-Fetch-User": "?1",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "es-ES,es;q=0.5",
+        "Connection": "keep-alive",
+        "DNT": "1",
+        "Sec-Fetch-Site": "cross-site",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
+        "Accept-Language": "it-IT,it;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+        "Cache-Control": "max-age=0",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "ja-JP,ja;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Accept-Language": "ko-KR,ko;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+        "Sec-Fetch-Dest": "document",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
+        "Accept-Language": "zh-CN,zh;q=0.5",
+        "Connection": "keep-alive",
+        "Pragma": "no-cache",
+    },
+    {
+        "Accept": "application/xhtml+xml,application/xml,*/*;q=0.8",
+        "Accept-Language": "ru-RU,ru;q=0.5",
+        "Connection": "keep-alive",
+        "DNT": "1",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-AU,en;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+        "Sec-Fetch-Mode": "navigate",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
+        "Accept-Language": "en-CA,en;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+    },
+    {
+        "Accept": "application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Accept-Language": "en-IE,en;q=0.5",
+        "Connection": "keep-alive",
+        "Sec-Fetch-Site": "none",
+        "Cache-Control": "max-age=0",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml",
+        "Accept-Language": "sv-SE,sv;q=0.5",
+        "Connection": "keep-alive",
+        "DNT": "1",
+        "Sec-Fetch-Dest": "document",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
+        "Accept-Language": "pt-PT,pt;q=0.5",
+        "Connection": "keep-alive",
+        "Pragma": "no-cache",
+        "Sec-Fetch-Mode": "navigate",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "nl-NL,nl;q=0.5",
+        "Connection": "keep-alive",
+        "Sec-Fetch-Site": "same-origin",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
+        "Accept-Language": "pl-PL,pl;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+    },
+    {
+        "Accept": "application/json",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Connection": "keep-alive",
+        "X-Requested-With": "XMLHttpRequest",
+    },
+    {
+        "Accept": "application/x-www-form-urlencoded",
+        "Accept-Language": "en-GB,en;q=0.5",
+        "Connection": "keep-alive",
+    },
+    {
+        "Accept": "text/html,*/*;q=0.8",
+        "Accept-Language": "fr-FR,fr;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "de-DE,de;q=0.5",
+        "Connection": "keep-alive",
+        "Sec-Fetch-Dest": "document",
+    },
+    {
+        "Accept": "image/webp,image/*,*/*;q=0.8",
+        "Accept-Language": "es-ES,es;q=0.5",
+        "Connection": "keep-alive",
+        "DNT": "1",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "it-IT,it;q=0.5",
+        "Connection": "keep-alive",
+        "Sec-Fetch-Mode": "navigate",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "ja-JP,ja;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Accept-Language": "ko-KR,ko;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
+        "Accept-Language": "zh-CN,zh;q=0.5",
+        "Connection": "keep-alive",
+        "Pragma": "no-cache",
+    },
+    {
+        "Accept": "application/xhtml+xml,application/xml,*/*;q=0.8",
+        "Accept-Language": "ru-RU,ru;q=0.5",
+        "Connection": "keep-alive",
+        "DNT": "1",
+        "Sec-Fetch-Site": "cross-site",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-AU,en;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
+        "Accept-Language": "en-CA,en;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+        "Cache-Control": "max-age=0",
+    },
+    {
+        "Accept": "application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Accept-Language": "en-IE,en;q=0.5",
+        "Connection": "keep-alive",
+        "Sec-Fetch-Site": "none",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml",
+        "Accept-Language": "sv-SE,sv;q=0.5",
+        "Connection": "keep-alive",
+        "DNT": "1",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
+        "Accept-Language": "pt-PT,pt;q=0.5",
+        "Connection": "keep-alive",
+        "Pragma": "no-cache",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "nl-NL,nl;q=0.5",
+        "Connection": "keep-alive",
+        "Sec-Fetch-Mode": "navigate",
+    },
+    {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
+        "Accept-Language": "pl-PL,pl;q=0.5",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+        "Sec-Fetch-Dest": "document",
+    },
+)
+
+HEADERS_API_OPTIONS = (
+    {
+        "Accept": "application/json",
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip, deflate, br",
+        "DNT": "1",
+        "Cache-Control": "no-cache",
+        "Pragma": "no-cache",
+    },
+    {
+        "Accept": "application/xml",
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip, deflate",
+        "DNT": "1",
+        "X-Requested-With": "XMLHttpRequest",
+    },
+    {
+        "Accept": "*/*",
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip, deflate",
+        "Cache-Control": "no-cache",
+        "X-Forwarded-Proto": "https",
+    },
+    {
+        "Accept": "application/json, text/plain, */*",
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip, deflate, br",
+        "X-Real-IP": "192.0.2.123",
+    },
+    {
+        "Accept": "application/json",
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip, deflate",
+        "User-Token": "randomtoken123456",
+        "Forwarded": "for=198.51.100.50;proto=https",
+    },
+    {
+        "Accept": "application/json",
+        "Connection": "keep-alive",
+        "Accept-Language": "en-US,en;q=0.5",
+        "X-Trace-ID": "trace-56789",
+        "X-Device-ID": "device-98765",
+    },
+    {
+        "Accept": "application/vnd.api+json",
+        "Connection": "keep-alive",
+        "Authorization": "Bearer random_api_token",
+        "X-API-Version": "2.0",
+        "Accept-Encoding": "gzip, deflate, br",
+    },
+    {
+        "Accept": "application/ld+json",
+        "Connection": "keep-alive",
+        "X-Correlation-ID": "some_correlation_id",
+        "Content-Type": "application/json",
+        "Accept-Encoding": "gzip, deflate",
+    },
+    {
+        "Accept": "text/csv",
+        "Connection": "keep-alive",
+        "X-Auth-Token": "some_auth_token",
+        "Accept-Encoding": "gzip, deflate, br",
+        "Content-Type": "text/csv",
+    },
+    {
+        "Accept": "application/x-www-form-urlencoded",
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip, deflate",
+        "X-Client-Version": "1.1.0",
+        "Content-Type": "application/x-www-form-urlencoded",
+    },
+    {
+        "Accept": "application/protobuf",
+        "Connection": "keep-alive",
+        "Content-Type": "application/protobuf",
+        "Accept-Encoding": "gzip, deflate",
+    },
+    {
+        "Accept": "application/octet-stream",
+        "Connection": "keep-alive",
+        "Content-Type": "application/octet-stream",
+        "Accept-Encoding": "gzip, deflate, br",
+    },
+    {
+        "Accept": "application/graphql",
+        "Connection": "keep-alive",
+        "Content-Type": "application/graphql",
+        "Accept-Encoding": "gzip, deflate",
+    },
+    {
+        "Accept": "text/plain",
+        "Connection": "keep-alive",
+        "Content-Type": "text/plain",
+        "Accept-Encoding": "gzip, deflate, br",
+    },
+    {
+        "Accept": "application/jwt",
+        "Connection": "keep-alive",
+        "Authorization": "Bearer some_jwt_token",
+        "Accept-Encoding": "gzip, deflate",
+    },
+    {
+        "Accept": "application/vnd.ms-excel",
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip, deflate, br",
+        "Content-Type": "application/vnd.ms-excel",
+    },
+    {
+        "Accept": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip, deflate",
+        "Content-Type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    },
+    {
+        "Accept": "image/png",
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip, deflate",
+    },
+    {
+        "Accept": "image/jpeg",
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip, deflate, br",
+    },
+    {
+        "Accept": "image/gif",
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip, deflate",
+    },
+    {
+        "Accept": "application/pdf",
+        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip, deflate, br",
+    },
+)
+
+
+# Fake client IPs are drawn uniformly from 1.0.0.0-223.255.255.255 minus the
+# private/reserved ranges below, with host octets .1-.254. The allowed space is
+# a table of /24 block runs so one random draw and a bisect pick an address.
+FAKE_IP_EXCLUDED_RANGES = (
+    "10.0.0.0/8",
+    "127.0.0.0/8",
+    "172.16.0.0/12",
+    "192.168.0.0/16",
+    "100.64.0.0/10",  # Shared Address Space
+    "169.254.0.0/16",  # Link-local
+)
+
+
+def _build_fake_ip_blocks() -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """
+    Returns (starts, offsets): the first /24 block index of every allowed run,
+    and the cumulative block count before each run (plus the total at the end).
+    """
+    excluded = sorted(
+        (int(net.network_address) >> 8, int(net.broadcast_address) >> 8)
+        for net in map(IPv4Network, FAKE_IP_EXCLUDED_RANGES)
+    )
+    runs = []
+    start = 1 << 16  # 1.0.0.0/24
+    for first, last in excluded:
+        if first > start:
+            runs.append((start, first))
+        start = max(start, last + 1)
+    runs.append((start, 224 << 16))  # up to 223.255.255.0/24
+    offsets = [0]
+    for first, end in runs:
+        offsets.append(offsets[-1] + end - first)
+    return tuple(first for first, _ in runs), tuple(offsets)
+
+
+FAKE_IP_BLOCK_STARTS, FAKE_IP_BLOCK_OFFSETS = _build_fake_ip_blocks()
+FAKE_IP_HOSTS_PER_BLOCK = 254
+FAKE_IP_TOTAL = FAKE_IP_BLOCK_OFFSETS[-1] * FAKE_IP_HOSTS_PER_BLOCK
+
+
 class SimulatedUser:
+    # No per-instance __dict__; there is one of these per simulated user
+    __slots__ = ("is_authenticated", "auth_token", "rng")
+
     def __init__(self, is_authenticated: bool, auth_token: Optional[str] = None):
         self.is_authenticated = is_authenticated
         self.auth_token = auth_token
+        # Independently seeded RNG for this user's behaviour (headers, paths,
+        # pacing). Variable values still come from the module-level generator.
+        self.rng = random.Random()
+
+
+class OverrideResolver(aiohttp.abc.AbstractResolver):
+    """
+    Resolves the target hostname to the DNS-override IP without a lookup.
+    Any other host (e.g. a redirect target) goes to the wrapped resolver.
+    """
+
+    def __init__(self, hostname: str, ip: str, fallback: aiohttp.abc.AbstractResolver):
+        self._hostname = hostname
+        self._ip = ip
+        self._family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+        self._fallback = fallback
+
+    async def resolve(
+        self, host: str, port: int = 0, family: int = socket.AF_INET
+    ) -> List[Dict[str, Any]]:
+        if host != self._hostname:
+            return await self._fallback.resolve(host, port, family)
+        return [
+            {
+                "hostname": host,
+                "host": self._ip,
+                "port": port,
+                "family": self._family,
+                "proto": 0,
+                "flags": socket.AI_NUMERICHOST,
+            }
+        ]
+
+    async def close(self) -> None:
+        await self._fallback.close()
 
 
 class TrafficGenerator:
     def __init__(self, config: ContainerConfig, site_map: SiteMap, metrics: Metrics):
+        # trusted: already validated at API boundary. The adapter runs
+        # StartRequest.model_validate once per start; use the models as-is (or
+        # model_construct for derived copies) rather than validating again.
         self.config = config
-        self.site_map = site_map  # This will now be correctly validated
+        self.site_map = site_map
         self.metrics = metrics
-        self.session_semaphore = asyncio.Semaphore(self.config.rate_limit)
+        # Token bucket enforcing rate_limit requests per second across all
+        # users, with up to one second of burst.
+        self._tokens = float(self.config.rate_limit)
+        self._token_ts = time.monotonic()
         self.running = False
-        self.user_tasks = []  # Keep track of user tasks
-        self.metrics_task = None  # Keep track of metrics task
-
-        # Expanded and more robust user-agents lists for web
-        self.user_agents_web = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 12_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.6 Safari/605.1.15",
-            "Mozilla/5.0 (X11; Linux x86_64; rv:102.0) Gecko/20100101 Firefox/102.0",
-            "Mozilla/5.0 (iPad; CPU OS 15_5 like Mac OS X) AppleWebKit/606.1.15 (KHTML, like Gecko) Version/15.0 Mobile/15E148 Safari/605.1.15",
-            "Mozilla/5.0 (Android 12; Mobile; rv:102.0) Gecko/102.0 Firefox/102.0",
-            "Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/606.1.15 (KHTML, like Gecko) Version/15.6 Mobile/15E148 Safari/604.1",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 13.5; rv:109.0) Gecko/20100101 Firefox/115.0",
-            "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/115.0",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36 Edg/116.0.1938.69",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.5 Safari/605.1.15",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0"
-            "Mozilla/5.0 (Linux; Android 13; Pixel 7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Mobile Safari/537.36",
-        ]
-
-        # Expanded and more robust user-agents lists for API
-        self.user_agents_api = [
-            "PostmanRuntime/7.29.0",
-            "Python-requests/2.27.1",
-            "curl/7.79.1",
-            "Go-http-client/1.1",
-            "Wget/1.20.3 (linux-gnu)",
-            "Apache-HttpClient/4.5.13 (Java/11.0.15)",
-            "axios/0.21.1 Node.js/v14.17.0",
-            "Java/1.8.0_281",
-            "libwww-perl/6.31",
-            "HTTPie/2.5.0",
-            "okhttp/4.9.1",
-            "Faraday v2.7.10",
-            "Dart/2.17 (dart:io)",
-            "Xamarin/3.0.0 (Xamarin.Android; Android 13; SDK 33)",
-            "Insomnia/2023.5.8",
-            "Nodejs-v16.16.0",
-            "Dalvik/2.1.0 (Linux; U; Android 13; SM-S918B Build/TP1A.220624.014)",
-            "aws-sdk-js-2.1395.0",
-            "Swift-URLSession",
-            "ruby rest-client/2.1.0",
-        ]
-
-        self.headers_web_options = [
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "DNT": "1",
-            },
-            {
-                "Accept": "application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-GB,en;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "DNT": "1",
-                "Sec-Fetch-Site": "none",
-                "Sec-Fetch-Mode": "navigate",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml",
-                "Accept-Language": "fr-FR,fr;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "Cache-Control": "no-cache",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
-                "Accept-Language": "de-DE,de;q=0.5",
-                "Connection": "keep-alive",
-                "Pragma": "no-cache",
-                "Sec-Fetch-User": "?1",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "es-ES,es;q=0.5",
-                "Connection": "keep-alive",
-                "DNT": "1",
-                "Sec-Fetch-Site": "cross-site",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
-                "Accept-Language": "it-IT,it;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "Cache-Control": "max-age=0",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "ja-JP,ja;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "ko-KR,ko;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "Sec-Fetch-Dest": "document",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
-                "Accept-Language": "zh-CN,zh;q=0.5",
-                "Connection": "keep-alive",
-                "Pragma": "no-cache",
-            },
-            {
-                "Accept": "application/xhtml+xml,application/xml,*/*;q=0.8",
-                "Accept-Language": "ru-RU,ru;q=0.5",
-                "Connection": "keep-alive",
-                "DNT": "1",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "en-AU,en;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "Sec-Fetch-Mode": "navigate",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
-                "Accept-Language": "en-CA,en;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-            },
-            {
-                "Accept": "application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-IE,en;q=0.5",
-                "Connection": "keep-alive",
-                "Sec-Fetch-Site": "none",
-                "Cache-Control": "max-age=0",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml",
-                "Accept-Language": "sv-SE,sv;q=0.5",
-                "Connection": "keep-alive",
-                "DNT": "1",
-                "Sec-Fetch-Dest": "document",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
-                "Accept-Language": "pt-PT,pt;q=0.5",
-                "Connection": "keep-alive",
-                "Pragma": "no-cache",
-                "Sec-Fetch-Mode": "navigate",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "nl-NL,nl;q=0.5",
-                "Connection": "keep-alive",
-                "Sec-Fetch-Site": "same-origin",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
-                "Accept-Language": "pl-PL,pl;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-            },
-            {
-                "Accept": "application/json",
-                "Accept-Language": "en-US,en;q=0.5",
-                "Connection": "keep-alive",
-                "X-Requested-With": "XMLHttpRequest",
-            },
-            {
-                "Accept": "application/x-www-form-urlencoded",
-                "Accept-Language": "en-GB,en;q=0.5",
-                "Connection": "keep-alive",
-            },
-            {
-                "Accept": "text/html,*/*;q=0.8",
-                "Accept-Language": "fr-FR,fr;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "de-DE,de;q=0.5",
-                "Connection": "keep-alive",
-                "Sec-Fetch-Dest": "document",
-            },
-            {
-                "Accept": "image/webp,image/*,*/*;q=0.8",
-                "Accept-Language": "es-ES,es;q=0.5",
-                "Connection": "keep-alive",
-                "DNT": "1",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "it-IT,it;q=0.5",
-                "Connection": "keep-alive",
-                "Sec-Fetch-Mode": "navigate",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "ja-JP,ja;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "ko-KR,ko;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
-                "Accept-Language": "zh-CN,zh;q=0.5",
-                "Connection": "keep-alive",
-                "Pragma": "no-cache",
-            },
-            {
-                "Accept": "application/xhtml+xml,application/xml,*/*;q=0.8",
-                "Accept-Language": "ru-RU,ru;q=0.5",
-                "Connection": "keep-alive",
-                "DNT": "1",
-                "Sec-Fetch-Site": "cross-site",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "en-AU,en;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
-                "Accept-Language": "en-CA,en;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "Cache-Control": "max-age=0",
-            },
-            {
-                "Accept": "application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-IE,en;q=0.5",
-                "Connection": "keep-alive",
-                "Sec-Fetch-Site": "none",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml",
-                "Accept-Language": "sv-SE,sv;q=0.5",
-                "Connection": "keep-alive",
-                "DNT": "1",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
-                "Accept-Language": "pt-PT,pt;q=0.5",
-                "Connection": "keep-alive",
-                "Pragma": "no-cache",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "nl-NL,nl;q=0.5",
-                "Connection": "keep-alive",
-                "Sec-Fetch-Mode": "navigate",
-            },
-            {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
-                "Accept-Language": "pl-PL,pl;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "Sec-Fetch-Dest": "document",
-            },
-        ]
-
-        self.headers_api_options = [
-            {
-                "Accept": "application/json",
-                "Connection": "keep-alive",
-                "Accept-Encoding": "gzip, deflate, br",
-                "DNT": "1",
-                "Cache-Control": "no-cache",
-                "Pragma": "no-cache",
-            },
-            {
-                "Accept": "application/xml",
-                "Connection": "keep-alive",
-                "Accept-Encoding": "gzip, deflate",
-                "DNT": "1",
-                "X-Requested-With": "XMLHttpRequest",
-            },
-            {
-                "Accept": "*/*",
-                "Connection": "keep-alive",
-                "Accept-Encoding": "gzip, deflate",
-                "Cache-Control": "no-cache",
-                "X-Forwarded-Proto": "https",
-            },
-            {
-                "Accept": "application/json, text/plain, */*",
-                "Connection": "keep-alive",
-                "Accept-Encoding": "gzip, deflate, br",
-                "X-Real-IP": "192.0.2.123",
-            },
-            {
-                "Accept": "application/json",
-                "Connection": "keep-alive",
-                "Accept-Encoding": "gzip, deflate",
-                "User-Token": "randomtoken123456",
-                "Forwarded": "for=198.51.100.50;proto=https",
-            },
-            {
-                "Accept": "application/json",
-                "Connection": "keep-alive",
-                "Accept-Language": "en-US,en;q=0.5",
-                "X-Trace-ID": "trace-56789",
-                "X-Device-ID": "device-98765",
-            },
-            {
-                "Accept": "application/vnd.api+json",
-                "Connection": "keep-alive",
-                "Authorization": "Bearer random_api_token",
-                "X-API-Version": "2.0",
-                "Accept-Encoding": "gzip, deflate, br",
-            },
-            {
-                "Accept": "application/ld+json",
-                "Connection": "keep-alive",
-                "X-Correlation-ID": "some_correlation_id",
-                "Content-Type": "application/json",
-                "Accept-Encoding": "gzip, deflate",
-            },
-            {
-                "Accept": "text/csv",
-                "Connection": "keep-alive",
-                "X-Auth-Token": "some_auth_token",
-                "Accept-Encoding": "gzip, deflate, br",
-                "Content-Type": "text/csv",
-            },
-            {
-                "Accept": "application/x-www-form-urlencoded",
-                "Connection": "keep-alive",
-                "Accept-Encoding": "gzip, deflate",
-                "X-Client-Version": "1.1.0",
-                "Content-Type": "application/x-www-form-urlencoded",
-            },
-            {
-                "Accept": "application/protobuf",
-                "Connection": "keep-alive",
-                "Content-Type": "application/protobuf",
-                "Accept-Encoding": "gzip, deflate",
-            },
-            {
-                "Accept": "application/octet-stream",
-                "Connection": "keep-alive",
-                "Content-Type": "application/octet-stream",
-                "Accept-Encoding": "gzip, deflate, br",
-            },
-            {
-                "Accept": "application/graphql",
-                "Connection": "keep-alive",
-                "Content-Type": "application/graphql",
-                "Accept-Encoding": "gzip, deflate",
-            },
-            {
-                "Accept": "text/plain",
-                "Connection": "keep-alive",
-                "Content-Type": "text/plain",
-                "Accept-Encoding": "gzip, deflate, br",
-            },
-            {
-                "Accept": "application/jwt",
-                "Connection": "keep-alive",
-                "Authorization": "Bearer some_jwt_token",
-                "Accept-Encoding": "gzip, deflate",
-            },
-            {
-                "Accept": "application/vnd.ms-excel",
-                "Connection": "keep-alive",
-                "Accept-Encoding": "gzip, deflate, br",
-                "Content-Type": "application/vnd.ms-excel",
-            },
-            {
-                "Accept": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                "Connection": "keep-alive",
-                "Accept-Encoding": "gzip, deflate",
-                "Content-Type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            },
-            {
-                "Accept": "image/png",
-                "Connection": "keep-alive",
-                "Accept-Encoding": "gzip, deflate",
-            },
-            {
-                "Accept": "image/jpeg",
-                "Connection": "keep-alive",
-                "Accept-Encoding": "gzip, deflate, br",
-            },
-            {
-                "Accept": "image/gif",
-                "Connection": "keep-alive",
-                "Accept-Encoding": "gzip, deflate",
-            },
-            {
-                "Accept": "application/pdf",
-                "Connection": "keep-alive",
-                "Accept-Encoding": "gzip, deflate, br",
-            },
-        ]
+        # Single top-level task owning a TaskGroup with every user and the
+        # metrics loop; cancelling it tears the whole group down.
+        self._run_task: Optional[asyncio.Task] = None
+        # Shared by all simulated users; created in start_generating because
+        # aiohttp sessions must be bound to a running event loop.
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # Shared, read-only tables; each user draws its defaults from them
+        self.user_agents_web = USER_AGENTS_WEB
+        self.user_agents_api = USER_AGENTS_API
+        self.headers_web_options = HEADERS_WEB_OPTIONS
+        self.headers_api_options = HEADERS_API_OPTIONS
+        # The same header sets as CIMultiDicts, aiohttp's native header type, so
+        # merging them per request is a C-level update that aiohttp need not
+        # convert again. Treated as read-only.
+        self._web_header_templates = tuple(CIMultiDict(h) for h in HEADERS_WEB_OPTIONS)
+        self._api_header_templates = tuple(CIMultiDict(h) for h in HEADERS_API_OPTIONS)
 
         # Parse the original target URL
         self.parsed_url = urlparse(self.config.traffic_target_url)
@@ -684,23 +954,171 @@ class TrafficGenerator:
         self.default_port = 443 if self.original_scheme == "https" else 80
         self.target_ip = self.config.traffic_target_dns_override or self.original_host
 
+        # Build the scheme://netloc prefix once; requests only append their
+        # path. A DNS override is applied by the connector's resolver, so URLs
+        # keep the original host (and with it the Host header and TLS SNI).
+        netloc = self.parsed_url.netloc
+        self._base_url = f"{self.original_scheme}://{netloc}"
+        # Rendered URLs are built from parts (no string parse) when the
+        # authority needs no IDNA/userinfo handling
+        self._base_netloc = netloc
+        self._build_encoded_urls = netloc.isascii() and "@" not in netloc
+
+        # Path definitions a user can pick from, per authentication state
+        self._paths_unauth: Tuple[PathDefinition, ...] = tuple(self.site_map.paths)
+        self._paths_auth: Tuple[PathDefinition, ...] = self._paths_unauth + tuple(
+            self.site_map.paths_auth_req or []
+        )
+
+        # Paths without placeholders always produce the same URL; build their
+        # yarl.URL up front so aiohttp skips parsing the string per request.
+        self._static_urls: Dict[str, URL] = {}
+        for path_def in self._paths_auth:
+            for segments in path_def._path_segments:
+                if len(segments) == 1:
+                    self._static_urls[segments[0]] = URL(self.build_url(segments[0]))
+
+        # Pre-split templates for the sitemap strings that go through
+        # replace_variables (paths and bodies carry their own on PathDefinition)
+        self._template_plans: Dict[str, Tuple[str, ...]] = {}
+        self._compile_templates()
+        # Without any variables every placeholder renders as itself, so
+        # substitution can never change a value
+        self._needs_substitution = bool(self.site_map.variables)
+
+        # list variables rendered (str + URL-encoding) once; a draw is then
+        # just a random.choice over the finished strings
+        self._list_values: Dict[str, Tuple[str, ...]] = {
+            name: tuple(self._encode_value(name, str(v)) for v in var_def.value)
+            for name, var_def in self.site_map.variables.items()
+            if var_def.type == "list" and var_def.value
+        }
+        # One draw function per valid variable, resolved once, so a render
+        # costs a single lookup per placeholder. Undefined or invalid
+        # variables are left to _variable_value, which logs and keeps the
+        # placeholder. random is looked up at call time, not bound here.
+        self._var_drawers: Dict[str, Callable[[], str]] = {}
+        for name, var_def in self.site_map.variables.items():
+            if name in self._list_values:
+                self._var_drawers[name] = lambda values=self._list_values[name]: (
+                    random.choice(values)
+                )
+            elif (
+                var_def.type == "range"
+                and len(var_def.value) == 2
+                and all(isinstance(x, int) for x in var_def.value)
+                and var_def.value[0] <= var_def.value[1]
+            ):
+                # str(int) never needs URL-encoding. Inverted ranges are left
+                # to _variable_value, which logs randint's error.
+                low, high = var_def.value
+                self._var_drawers[name] = lambda low=low, high=high: str(
+                    random.randint(low, high)
+                )
+
+        # json_body credentials serialized once with their @placeholders kept
+        # inside the JSON strings; each login only splices in (JSON-escaped)
+        # values instead of walking the dict. Each string field still draws
+        # its own values, as the walk did.
+        self._auth_json_template: Optional[Tuple[Tuple[str, ...], FrozenSet[int]]] = (
+            None
+        )
+        auth = self.site_map.auth
+        if auth and auth.credentials.json_body:
+            self._auth_json_template = compile_json_template(auth.credentials.json_body)
+
+        # Auth method and type-specific headers resolved once per sitemap.
+        # custom_header values keep their @placeholders (rendered per attempt);
+        # None means the credentials the auth type needs are missing.
+        self._auth_method = "GET"
+        self._auth_headers: Optional[Dict[str, str]] = None
+        if auth:
+            self._auth_method = auth.auth_method.upper()
+            self._auth_headers = self._prepare_auth_headers(auth)
+
+        # query_params credentials: keys quoted once, and the whole query
+        # string built once when neither value holds a placeholder
+        self._auth_query: Tuple[Tuple[str, str], ...] = ()
+        self._auth_query_string: Optional[str] = None
+        if auth and auth.auth_type == "query_params" and auth.credentials.body_params:
+            creds = auth.credentials.body_params
+            self._auth_query = tuple(
+                (f"{quote(k)}=", v or "")
+                for k, v in (("username", creds.username), ("password", creds.password))
+            )
+            if not self._needs_substitution or not any(
+                "@" in v for _, v in self._auth_query
+            ):
+                self._auth_query_string = self._render_auth_query()
+
+        # Override patterns compiled once; the first match wins per request
+        oh = self.site_map.path_headers_override
+        self._override_matchers: List[Tuple["re.Pattern[str]", str]] = []
+        if oh and oh.paths and oh.headers:
+            self._override_matchers = [
+                (compile_path_pattern(pattern), pattern) for pattern in oh.paths
+            ]
+
         self.configure_logging(self.config.debug)
 
     def configure_logging(self, debug: bool):
-        if debug:
-            logger.setLevel(logging.DEBUG)
-            console_handler.setLevel(logging.DEBUG)
-        else:
-            logger.setLevel(logging.INFO)
-            console_handler.setLevel(logging.INFO)
+        level = logging.DEBUG if debug else logging.INFO
+        if logger.level == level and console_handler.level == level:
+            return  # Already configured; setLevel would also flush the level cache
+        logger.setLevel(level)
+        console_handler.setLevel(level)
 
     def create_session(self) -> aiohttp.ClientSession:
-        # Note: DNS override is handled by constructing the URL with the IP,
-        # and setting the Host header. aiohttp's built-in resolver/connector
-        # options for DNS override can be complex; this approach is often simpler.
-        connector = aiohttp.TCPConnector(ssl=False)
+        # One pooled connector serves every simulated user, so keep-alive
+        # connections and cached DNS lookups are reused across sessions.
+        connector = aiohttp.TCPConnector(
+            ssl=False,
+            resolver=self.create_resolver(),
+            limit=max(self.config.rate_limit * 2, self.config.sim_users, 200),
+            limit_per_host=0,
+            ttl_dns_cache=300,
+            keepalive_timeout=75,
+        )
         return aiohttp.ClientSession(connector=connector)
 
+    def create_resolver(self) -> aiohttp.abc.AbstractResolver:
+        # Resolve through c-ares instead of getaddrinfo on the loop's thread
+        # pool executor.
+        try:
+            resolver = aiohttp.AsyncResolver()
+        except RuntimeError as e:
+            logger.warning(f"aiodns unavailable, using threaded DNS resolver: {e}")
+            resolver = aiohttp.ThreadedResolver()
+        # With a DNS override the target host never needs a lookup
+        if self.config.traffic_target_dns_override:
+            return OverrideResolver(self.original_host, self.target_ip, resolver)
+        return resolver
+
+    def _reserve_token(self) -> float:
+        """
+        Takes a token from the bucket and returns how long the caller must
+        sleep before using it (0.0 when one was available).
+        """
+        rate = self.config.rate_limit
+        if rate <= 0:
+            return 0.0  # No limit configured
+        now = time.monotonic()
+        self._tokens = min(rate, self._tokens + (now - self._token_ts) * rate)
+        self._token_ts = now
+        # Reserve a token up front. A negative balance is the queue of callers
+        # ahead of us, so each sleeps exactly until its own slot; no lock needed
+        # on a single event loop.
+        self._tokens -= 1
+        if self._tokens < 0:
+            return -self._tokens / rate
+        return 0.0
+
+    async def _acquire_token(self):
+        """Waits until the token bucket allows another request."""
+        delay = self._reserve_token()
+        if delay:
+            await asyncio.sleep(delay)
+
     async def start_generating(self):
         if self.running:
             logger.warning("Traffic generation is already running.")
@@ -708,20 +1126,22 @@ class TrafficGenerator:
         self.running = True
         logger.info("Starting traffic generation tasks.")
 
-        self.user_tasks = []
-        for _ in range(self.config.sim_users):
-            task = asyncio.create_task(self.simulate_user())
-            self.user_tasks.append(task)
+        if self._session is None or self._session.closed:
+            self._session = self.create_session()
 
-        # Only create metrics task if it doesn't exist or isn't running
-        if self.metrics_task is None or self.metrics_task.done():
-            self.metrics_task = asyncio.create_task(self.metrics_loop())
+        self._run_task = asyncio.create_task(self._run())
 
         # Don't await here; let it run in the background
         logger.info(
-            f"Launched {len(self.user_tasks)} user simulation tasks and metrics loop."
+            f"Launching {self.config.sim_users} user simulation tasks and metrics loop."
         )
 
+    async def _run(self):
+        async with asyncio.TaskGroup() as group:
+            for _ in range(self.config.sim_users):
+                group.create_task(self.simulate_user())
+            group.create_task(self.metrics_loop())
+
     async def stop_generating(self):
         if not self.running:
             logger.warning("Traffic generation not running.")
@@ -729,28 +1149,23 @@ class TrafficGenerator:
         logger.info("Stopping traffic generation.")
         self.running = False  # Signal tasks to stop
 
-        # Cancel all tasks
-        if self.metrics_task:
-            self.metrics_task.cancel()
-        for task in self.user_tasks:
-            task.cancel()
-
-        # Wait for tasks to finish cancelling
-        results = await asyncio.gather(
-            *(self.user_tasks + ([self.metrics_task] if self.metrics_task else [])),
-            return_exceptions=True,
-        )
-
-        # Log any unexpected errors during cancellation/shutdown
-        for result in results:
-            if isinstance(result, Exception) and not isinstance(
-                result, asyncio.CancelledError
-            ):
-                logger.error(f"Error during task shutdown: {result}")
-
-        # Clear task lists
-        self.user_tasks = []
-        self.metrics_task = None
+        # Cancelling the run task cancels every task in its group and waits
+        # for them to finish
+        if self._run_task:
+            self._run_task.cancel()
+            results = await asyncio.gather(self._run_task, return_exceptions=True)
+
+            # Log any unexpected errors during cancellation/shutdown
+            for result in results:
+                if isinstance(result, Exception) and not isinstance(
+                    result, asyncio.CancelledError
+                ):
+                    logger.error(f"Error during task shutdown: {result!r}")
+            self._run_task = None
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
         logger.info("Traffic generation stopped.")
 
     async def metrics_loop(self):
@@ -776,96 +1191,103 @@ class TrafficGenerator:
     async def simulate_user(self):
         """Simulates a single user session."""
         fake_ip = self.generate_random_ip()
-        user_web_headers = random.choice(self.headers_web_options).copy()  # Use copy
-        user_web_ua = random.choice(self.user_agents_web)
-        user_api_headers = random.choice(self.headers_api_options).copy()  # Use copy
-        user_api_ua = random.choice(self.user_agents_api)
+        sim_user = SimulatedUser(is_authenticated=False)  # Start as not authenticated
+        rng = sim_user.rng
+        loop = asyncio.get_running_loop()
+        # Everything but auth and overrides is fixed for the user's lifetime,
+        # so merge it once per traffic type
+        user_web_headers = self.build_user_headers(
+            fake_ip,
+            rng.choice(self._web_header_templates),
+            rng.choice(self.user_agents_web),
+        )
+        user_api_headers = self.build_user_headers(
+            fake_ip,
+            rng.choice(self._api_header_templates),
+            rng.choice(self.user_agents_api),
+        )
 
         # Decide initial authentication state based on sitemap config and randomness
         # Note: site_map.auth will be None if has_auth is false, due to the validator
         initial_auth_needed = self.site_map.has_auth and self.site_map.auth is not None
-        is_authenticated = initial_auth_needed and random.choice(
+        is_authenticated = initial_auth_needed and rng.choice(
             [True, False]
         )  # Only try auth if needed and randomly chosen
-        sim_user = SimulatedUser(is_authenticated=False)  # Start as not authenticated
 
         try:
-            async with self.create_session() as session:
-                # --- Authentication Phase (if applicable) ---
-                if (
-                    initial_auth_needed and is_authenticated
-                ):  # Check if auth is configured AND this user attempts it
-                    logger.debug(f"User {fake_ip} attempting authentication.")
-                    auth_token = await self.perform_authentication(
-                        session, {self.config.xff_header_name: fake_ip}
-                    )
-                    if auth_token:
-                        sim_user.is_authenticated = True
-                        sim_user.auth_token = auth_token
-                        logger.info(f"User {fake_ip} authenticated successfully.")
-                    else:
-                        # If auth attempt fails, remain unauthenticated
-                        sim_user.is_authenticated = False
-                        logger.warning(f"User {fake_ip} authentication failed.")
-                elif initial_auth_needed:
-                    logger.debug(
-                        f"User {fake_ip} starting session unauthenticated (by random choice)."
-                    )
+            session = self._session
+            # --- Authentication Phase (if applicable) ---
+            if (
+                initial_auth_needed and is_authenticated
+            ):  # Check if auth is configured AND this user attempts it
+                logger.debug("User %s attempting authentication.", fake_ip)
+                auth_token = await self.perform_authentication(
+                    session, {self.config.xff_header_name: fake_ip}
+                )
+                if auth_token:
+                    sim_user.is_authenticated = True
+                    sim_user.auth_token = auth_token
+                    logger.info(f"User {fake_ip} authenticated successfully.")
                 else:
-                    logger.debug(
-                        f"User {fake_ip} starting session (no auth configured)."
-                    )
+                    # If auth attempt fails, remain unauthenticated
+                    sim_user.is_authenticated = False
+                    logger.warning(f"User {fake_ip} authentication failed.")
+            elif initial_auth_needed:
+                logger.debug(
+                    "User %s starting session unauthenticated (by random choice).",
+                    fake_ip,
+                )
+            else:
+                logger.debug("User %s starting session (no auth configured).", fake_ip)
 
-                # --- Session Request Loop ---
-                while self.running:
-                    session_length_seconds = random.randint(
-                        self.config.min_session_length, self.config.max_session_length
-                    )
-                    session_end_time = time.monotonic() + session_length_seconds
-                    logger.debug(
-                        f"User {fake_ip} starting session, length {session_length_seconds}s. Authenticated: {sim_user.is_authenticated}"
+            # --- Session Request Loop ---
+            while self.running:
+                session_length_seconds = rng.randint(
+                    self.config.min_session_length, self.config.max_session_length
+                )
+                session_end_time = time.monotonic() + session_length_seconds
+                logger.debug(
+                    "User %s starting session, length %ss. Authenticated: %s",
+                    fake_ip,
+                    session_length_seconds,
+                    sim_user.is_authenticated,
+                )
+
+                while self.running and time.monotonic() < session_end_time:
+                    # --- Request Execution ---
+                    # Respect rate limit; only suspends when the bucket is empty
+                    delay = self._reserve_token()
+                    if delay:
+                        await asyncio.sleep(delay)
+                    request_performed = False
+                    try:
+                        await self.perform_request(
+                            session,
+                            user_web_headers,  # User-specific web headers
+                            user_api_headers,  # User-specific API headers
+                            sim_user,  # User's current auth state
+                        )
+                        request_performed = True
+                    except asyncio.CancelledError:
+                        logger.debug("Request cancelled for user %s.", fake_ip)
+                        raise  # Re-raise CancelledError to stop the user task
+                    except Exception as e:
+                        logger.error(f"Request failed for user {fake_ip}: {e}")
+
+                    # --- Post-Request ---
+                    if request_performed:
+                        self.metrics.increment()
+
+                    # Random delay between requests within a session. The
+                    # wakeup is rounded up to a shared tick so users with
+                    # close deadlines are resumed in the same loop iteration.
+                    await sleep_until(
+                        loop, next_think_tick(loop.time() + rng.uniform(0.1, 1.0))
                     )
 
-                    while self.running and time.monotonic() < session_end_time:
-                        # --- Request Execution ---
-                        await self.session_semaphore.acquire()  # Respect rate limit
-                        request_performed = False
-                        try:
-                            # Build base headers for this request
-                            base_headers = dict(self.site_map.global_headers)
-                            base_headers[self.config.xff_header_name] = fake_ip
-
-                            await self.perform_request(
-                                session,
-                                base_headers,  # Pass fresh base headers
-                                user_web_headers,  # User-specific web headers
-                                user_web_ua,  # User-specific web UA
-                                user_api_headers,  # User-specific API headers
-                                user_api_ua,  # User-specific API UA
-                                sim_user,  # User's current auth state
-                            )
-                            request_performed = True
-                        except asyncio.CancelledError:
-                            logger.debug(f"Request cancelled for user {fake_ip}.")
-                            self.session_semaphore.release()  # Release semaphore if cancelled mid-request
-                            raise  # Re-raise CancelledError to stop the user task
-                        except Exception as e:
-                            logger.error(f"Request failed for user {fake_ip}: {e}")
-                        finally:
-                            # Only release semaphore if it was acquired and not already released (e.g., by cancellation)
-                            # Check semaphore count if needed, but simple release is usually ok here.
-                            self.session_semaphore.release()
-
-                        # --- Post-Request ---
-                        if request_performed:
-                            await self.metrics.increment()
-
-                        # Random delay between requests within a session
-                        await asyncio.sleep(random.uniform(0.1, 1.0))
-
-                    logger.debug(f"User {fake_ip} finished session segment.")
-                    # Optional: Add a longer delay between sessions for a user?
-                    # await asyncio.sleep(random.uniform(1.0, 5.0))
+                logger.debug("User %s finished session segment.", fake_ip)
+                # Optional: Add a longer delay between sessions for a user?
+                # await asyncio.sleep(random.uniform(1.0, 5.0))
 
         except asyncio.CancelledError:
             logger.info(f"User simulation cancelled for IP {fake_ip}.")
@@ -874,7 +1296,7 @@ class TrafficGenerator:
                 f"User simulation error for IP {fake_ip}: {e}", exc_info=True
             )  # Log traceback
         finally:
-            logger.debug(f"Exiting simulate_user task for IP {fake_ip}.")
+            logger.debug("Exiting simulate_user task for IP %s.", fake_ip)
 
     async def perform_authentication(
         self, session: aiohttp.ClientSession, base_headers: Dict[str, str]
@@ -888,123 +1310,58 @@ class TrafficGenerator:
 
         # Construct URL, considering potential DNS override
         auth_path = self.replace_variables(auth.auth_path)  # Replace variables in path
-        if self.config.traffic_target_dns_override:
-            port = self.parsed_url.port or self.default_port
-            # Determine netloc based on IP and port
-            if (self.original_scheme == "https" and port != 443) or (
-                self.original_scheme == "http" and port != 80
-            ):
-                netloc = f"{self.target_ip}:{port}"
-            else:
-                netloc = self.target_ip
-            auth_url = urlunparse((self.original_scheme, netloc, auth_path, "", "", ""))
-            # Add Host header for DNS override
-            auth_headers = {**base_headers, "Host": self.original_host}
-        else:
-            auth_url = urlunparse(
-                (self.original_scheme, self.parsed_url.netloc, auth_path, "", "", "")
+        auth_url = self.build_url(auth_path)
+        # Already validated to be non-empty, allowed and lower-cased
+        auth_type = auth.auth_type
+        method = self._auth_method  # Method for the auth request itself
+
+        if self._auth_headers is None:
+            logger.error(
+                f"{auth_type} auth selected but the required credentials were not found."
             )
-            auth_headers = base_headers.copy()  # Use copy of base headers
+            return None
 
-        auth_type = (
-            auth.auth_type.lower()
-        )  # Already validated to be non-empty and allowed type
-        method = auth.auth_method.upper()  # Method for the auth request itself
+        auth_headers = dict(base_headers)
+        if auth_type == "custom_header":
+            # Only custom header values take variables; the basic/bearer
+            # Authorization header is sent verbatim
+            for name, value in self._auth_headers.items():
+                auth_headers[name] = self.replace_variables(value)
+        else:
+            auth_headers.update(self._auth_headers)
 
-        # Prepare data/headers based on auth type
+        # Prepare data based on auth type
         request_data = None
-        request_json = None
 
-        logger.debug(f"Auth attempt: Type={auth_type}, Method={method}, URL={auth_url}")
+        logger.debug(
+            "Auth attempt: Type=%s, Method=%s, URL=%s", auth_type, method, auth_url
+        )
 
         try:
-            if auth_type == "basic":
-                # Assuming 'Authorization: Basic ...' is directly in credentials.header
-                if auth.credentials.header and auth.credentials.header.Authorization:
-                    auth_headers["Authorization"] = (
-                        auth.credentials.header.Authorization
-                    )
-                else:
-                    logger.error(
-                        "Basic auth selected but no Authorization header found in credentials."
-                    )
-                    return None
-            elif auth_type == "bearer":
-                # Assuming 'Authorization: Bearer ...' is directly in credentials.header
-                if auth.credentials.header and auth.credentials.header.Authorization:
-                    auth_headers["Authorization"] = (
-                        auth.credentials.header.Authorization
-                    )
-                else:
-                    logger.error(
-                        "Bearer auth selected but no Authorization header found in credentials."
-                    )
-                    return None
-            elif auth_type == "body_params":
-                if auth.credentials.body_params:
-                    auth_headers["Content-Type"] = "application/x-www-form-urlencoded"
-                    # Replace variables in credentials before sending
-                    username = self.replace_variables(
-                        auth.credentials.body_params.username or ""
-                    )
-                    password = self.replace_variables(
-                        auth.credentials.body_params.password or ""
-                    )
-                    request_data = {"username": username, "password": password}
-                    logger.debug(f"Auth body_params data: {request_data}")
-                else:
-                    logger.error(
-                        "body_params auth selected but no body_params credentials found."
-                    )
-                    return None
+            if auth_type == "body_params":
+                # Replace variables in credentials before sending
+                username = self.replace_variables(
+                    auth.credentials.body_params.username or ""
+                )
+                password = self.replace_variables(
+                    auth.credentials.body_params.password or ""
+                )
+                request_data = {"username": username, "password": password}
+                logger.debug("Auth body_params data: %s", request_data)
             elif auth_type == "json_body":
-                if auth.credentials.json_body:
-                    auth_headers["Content-Type"] = "application/json"
-                    # Recursively replace variables in the JSON body structure
-                    request_json = self._replace_variables_in_dict(
-                        auth.credentials.json_body
-                    )
-                    logger.debug(f"Auth json_body data: {request_json}")
-                else:
-                    logger.error(
-                        "json_body auth selected but no json_body credentials found."
-                    )
-                    return None
+                segments, fields = self._auth_json_template
+                request_data = self.render_template(
+                    segments, escape=json_escape, fields=fields
+                )
+                logger.debug("Auth json_body data: %s", request_data)
             elif auth_type == "query_params":
-                # Assuming username/password are in body_params for query_params type
-                if auth.credentials.body_params:
-                    username = self.replace_variables(
-                        auth.credentials.body_params.username or ""
-                    )
-                    password = self.replace_variables(
-                        auth.credentials.body_params.password or ""
-                    )
-                    params = {"username": username, "password": password}
-                    qstring = "&".join(
-                        [f"{quote(k)}={quote(v)}" for k, v in params.items() if v]
-                    )
-                    auth_url = f"{auth_url}?{qstring}"
-                    logger.debug(f"Auth query_params URL: {auth_url}")
-                else:
-                    logger.error(
-                        "query_params auth selected but no body_params credentials found for parameters."
-                    )
-                    return None
+                qstring = self._auth_query_string
+                if qstring is None:
+                    qstring = self._render_auth_query()
+                auth_url = f"{auth_url}?{qstring}"
+                logger.debug("Auth query_params URL: %s", auth_url)
             elif auth_type == "custom_header":
-                if auth.credentials.header:
-                    # Add all headers from credentials.header, replacing variables in values
-                    custom_headers = {
-                        k: self.replace_variables(v)
-                        for k, v in auth.credentials.header.dict().items()
-                        if v is not None
-                    }
-                    auth_headers.update(custom_headers)
-                    logger.debug(f"Auth custom_header headers added: {custom_headers}")
-                else:
-                    logger.error(
-                        "custom_header auth selected but no header credentials found."
-                    )
-                    return None
+                logger.debug("Auth custom_header headers added: %s", auth_headers)
 
             # --- Make the Authentication Request ---
             async with session.request(
@@ -1012,13 +1369,12 @@ class TrafficGenerator:
                 auth_url,
                 headers=auth_headers,
                 data=request_data,
-                json=request_json,
                 timeout=aiohttp.ClientTimeout(
                     total=10
                 ),  # Add timeout for auth requests
             ) as resp:
                 logger.debug(
-                    f"Auth request to {auth_url} returned status {resp.status}"
+                    "Auth request to %s returned status %s", auth_url, resp.status
                 )
                 if resp.status in [
                     200,
@@ -1041,7 +1397,10 @@ class TrafficGenerator:
                                 else None
                             )
 
-                        response_data = await resp.json()
+                        # orjson parses straight from the body bytes, skipping
+                        # resp.json()'s decode-to-str and stdlib parser. Its
+                        # JSONDecodeError subclasses json.JSONDecodeError.
+                        response_data = orjson.loads(await resp.read())
                         # --- Extract Token ---
                         # TODO: Make token extraction configurable?
                         # Common patterns: look for 'token', 'access_token', 'authToken' etc.
@@ -1053,7 +1412,7 @@ class TrafficGenerator:
 
                         if token:
                             logger.debug(
-                                f"Extracted auth token: {token[:10]}..."
+                                "Extracted auth token: %s...", token[:10]
                             )  # Log prefix
                             return str(token)  # Ensure it's a string
                         else:
@@ -1062,11 +1421,6 @@ class TrafficGenerator:
                             )
                             # Decide if this is acceptable (e.g., cookie-based session established)
                             return "authenticated_no_token"  # Indicate success without a specific token to carry
-                    except aiohttp.ContentTypeError:
-                        logger.error(
-                            f"Auth failed: Response from {auth_url} was not JSON (status {resp.status})."
-                        )
-                        return None
                     except json.JSONDecodeError:
                         logger.error(
                             f"Auth failed: Could not decode JSON response from {auth_url} (status {resp.status})."
@@ -1074,9 +1428,12 @@ class TrafficGenerator:
                         return None
                 else:
                     # Log failure details
-                    error_body = await resp.text()
+                    # Only the logged prefix is read
+                    error_body = (await resp.content.read(200)).decode(
+                        "utf-8", errors="replace"
+                    )
                     logger.warning(
-                        f"Auth request failed: Status {resp.status}, URL: {auth_url}, Response: {error_body[:200]}"
+                        f"Auth request failed: Status {resp.status}, URL: {auth_url}, Response: {error_body}"
                     )
                     return None
 
@@ -1093,66 +1450,56 @@ class TrafficGenerator:
             )
             return None
 
+    def build_user_headers(
+        self, fake_ip: str, type_headers: CIMultiDict, user_agent: str
+    ) -> CIMultiDict:
+        """
+        Merges global headers, XFF, the user's header set for a traffic type
+        and its User-Agent, in that precedence.
+        """
+        headers = CIMultiDict(self.site_map.global_headers)
+        headers[self.config.xff_header_name] = fake_ip
+        headers.update(type_headers)
+        headers["User-Agent"] = user_agent
+        return headers
+
     async def perform_request(
         self,
         session: aiohttp.ClientSession,
-        base_headers: Dict[
-            str, str
-        ],  # Base headers for this specific request (includes XFF)
-        user_web_headers: Dict[str, str],  # Default headers for this user if web
-        user_web_ua: str,  # Default UA for this user if web
-        user_api_headers: Dict[str, str],  # Default headers for this user if API
-        user_api_ua: str,  # Default UA for this user if API
+        user_web_headers: CIMultiDict,  # build_user_headers() result for web
+        user_api_headers: CIMultiDict,  # build_user_headers() result for API
         sim_user: SimulatedUser,  # Current state of the user (auth token etc.)
     ):
         """Performs a single request based on the sitemap and user state."""
+        # Checked once so disabled debug logs cost nothing below
+        debug = logger.isEnabledFor(logging.DEBUG)
         # Determine available paths based on user auth state
-        available_path_defs = list(self.site_map.paths)  # Start with non-auth paths
-        if sim_user.is_authenticated and self.site_map.paths_auth_req:
-            available_path_defs.extend(self.site_map.paths_auth_req)
+        available_path_defs = (
+            self._paths_auth if sim_user.is_authenticated else self._paths_unauth
+        )
 
         if not available_path_defs:
             logger.warning(
-                f"User {base_headers.get(self.config.xff_header_name, 'Unknown IP')} has no available paths. Skipping request."
+                f"User {user_web_headers.get(self.config.xff_header_name, 'Unknown IP')} has no available paths. Skipping request."
             )
             await asyncio.sleep(0.5)  # Prevent busy-loop if no paths available
             return
 
         # Choose a path definition and a specific path from it
-        path_def = random.choice(available_path_defs)
-        method = path_def.method.upper()  # Already validated
-        path_template = random.choice(path_def.paths)
-        path = self.replace_variables(path_template)  # Replace variables like @id
+        path_def = sim_user.rng.choice(available_path_defs)
+        method = path_def.method  # Already validated and upper-cased
+        path_segments = sim_user.rng.choice(path_def._path_segments)
+        path = self.render_template(path_segments)  # Replace variables like @id
 
         # --- Construct URL (handling DNS override) ---
-        final_url: str
-        request_headers = base_headers.copy()  # Start with XFF header etc.
-
-        if self.config.traffic_target_dns_override:
-            port = self.parsed_url.port or self.default_port
-            if (self.original_scheme == "https" and port != 443) or (
-                self.original_scheme == "http" and port != 80
-            ):
-                netloc = f"{self.target_ip}:{port}"
-            else:
-                netloc = self.target_ip  # IP only if default port
-            final_url = urlunparse((self.original_scheme, netloc, path, "", "", ""))
-            request_headers["Host"] = self.original_host  # Add Host header
-        else:
-            # Use the original hostname from the config URL
-            final_url = urlunparse(
-                (self.original_scheme, self.parsed_url.netloc, path, "", "", "")
-            )
-            # No Host header needed unless it was globally defined
-
+        final_url = self._static_urls.get(path) or self.build_request_url(path)
         # --- Determine Headers ---
-        # Merge base, global, type-specific, user-specific, and overrides
+        # Start from the user's merged headers for this traffic type; only auth
+        # and overrides are added per request
         if path_def.traffic_type == "web":
-            request_headers.update(user_web_headers)  # User's default web headers
-            request_headers["User-Agent"] = user_web_ua
+            request_headers = user_web_headers.copy()
         else:  # api
-            request_headers.update(user_api_headers)  # User's default API headers
-            request_headers["User-Agent"] = user_api_ua
+            request_headers = user_api_headers.copy()
 
         # Apply bearer token if user is authenticated and has a token
         # Handle the case where auth succeeded but didn't yield a specific token to carry
@@ -1165,76 +1512,59 @@ class TrafficGenerator:
             request_headers["Authorization"] = f"Bearer {sim_user.auth_token}"
 
         # Apply path-specific header overrides from sitemap
-        if self.site_map.path_headers_override:
-            oh = self.site_map.path_headers_override
-            # Check if path_headers_override is defined and has paths/headers
-            if oh.paths and oh.headers:
-                for override_pattern in oh.paths:
-                    # Use the matching function to see if the current path matches the pattern
-                    if self.match_path(path, override_pattern):
+        if self._override_matchers:
+            stripped_path = path.strip("/")
+            for matcher, override_pattern in self._override_matchers:
+                # Same semantics as match_path(path, override_pattern)
+                if matcher.fullmatch(stripped_path):
+                    if debug:
                         logger.debug(
-                            f"Applying header override for path {path} matching pattern {override_pattern}"
+                            "Applying header override for path %s matching pattern %s",
+                            path,
+                            override_pattern,
                         )
-                        # Replace variables in override header values
-                        override_headers = {
-                            k: self.replace_variables(v) for k, v in oh.headers.items()
-                        }
-                        request_headers.update(override_headers)
-                        break  # Apply only the first matching override pattern's headers
+                    # Replace variables in override header values
+                    override_headers = {
+                        k: self.replace_variables(v)
+                        for k, v in self.site_map.path_headers_override.headers.items()
+                    }
+                    request_headers.update(override_headers)
+                    break  # Apply only the first matching override pattern's headers
 
         # --- Determine Body ---
+        # The rendered template is sent as-is: JSON bodies are already JSON
+        # text, so parsing them only for aiohttp to re-serialize is skipped. The
+        # sitemap's Content-Type header describes the payload either way.
         request_data = None
-        request_json = None
-        if path_def.body:
+        if path_def._body_segments:
             # Replace variables in the body template
-            body_content = self.replace_variables(path_def.body)
-            # Try to parse as JSON if API type and Content-Type suggests JSON
-            content_type = request_headers.get("Content-Type", "").lower()
-            is_json_content = "application/json" in content_type
-
-            if path_def.traffic_type == "api" and is_json_content:
-                try:
-                    request_json = json.loads(body_content)
-                    logger.debug(f"Request body (JSON): {request_json}")
-                except json.JSONDecodeError:
-                    logger.warning(
-                        f"Body provided for API request to {path} with JSON Content-Type, but failed to parse as JSON. Sending as raw data. Body: {body_content[:100]}..."
-                    )
-                    request_data = (
-                        body_content  # Send as raw data if JSON parsing fails
-                    )
-                    # Ensure Content-Type doesn't mislead server if we send raw data
-                    # request_headers['Content-Type'] = 'text/plain' # Or remove? Or keep original? Keep for now.
-
-            else:
-                # For web requests or non-JSON API requests, send as form data or raw data
-                # Assuming www-form-urlencoded if content-type suggests it, else raw
-                if "application/x-www-form-urlencoded" in content_type:
-                    # Attempt to parse as key=value pairs if needed, or just send raw?
-                    # For simplicity, sending raw for now. Parse if required by target.
-                    request_data = body_content
-                    logger.debug(
-                        f"Request body (form-data/raw): {request_data[:100]}..."
-                    )
-                else:
-                    request_data = body_content  # Default to raw data
-                    logger.debug(f"Request body (raw): {request_data[:100]}...")
+            request_data = self.render_template(path_def._body_segments)
+            if debug:
+                logger.debug("Request body: %s...", request_data[:100])
 
         # --- Execute Request ---
         try:
-            logger.debug(f"Request: {method} {final_url} Headers: {request_headers}")
+            if debug:
+                logger.debug(
+                    "Request: %s %s Headers: %s", method, final_url, request_headers
+                )
             async with session.request(
                 method,
                 final_url,
                 headers=request_headers,
                 data=request_data,
-                json=request_json,
                 timeout=aiohttp.ClientTimeout(total=15),  # Timeout for regular requests
             ) as resp:
-                # Consume the response body fully to free up the connection
-                await resp.read()
+                # Drain the body so the connection goes back to the pool for
+                # keep-alive, without buffering it: release() on an unread
+                # response would close the connection instead.
+                async for _ in resp.content.iter_any():
+                    pass
                 # Always log the response status when debug logging is enabled
-                logger.debug(f"Response {resp.status} for {method} {final_url}")
+                if debug:
+                    logger.debug(
+                        "Response %s for %s %s", resp.status, method, final_url
+                    )
                 # Log errors/warnings based on status code
                 if resp.status >= 500:
                     logger.error(f"Server Error {resp.status} for {method} {final_url}")
@@ -1242,8 +1572,8 @@ class TrafficGenerator:
                     logger.warning(
                         f"Client Error {resp.status} for {method} {final_url}"
                     )
-                else:
-                    logger.debug(f"Success {resp.status} for {method} {final_url}")
+                elif debug:
+                    logger.debug("Success %s for %s %s", resp.status, method, final_url)
 
         # Handle potential exceptions during the request
         except aiohttp.ClientError as e:
@@ -1256,6 +1586,36 @@ class TrafficGenerator:
                 f"Unexpected error during request to {final_url}: {e}", exc_info=True
             )
 
+    def build_url(self, path: str) -> str:
+        """
+        Joins a request path onto the precomputed target base URL. Sitemap
+        paths are given their leading '/' at validation time, so this is a
+        plain concatenation.
+        """
+        return self._base_url + path
+
+    def build_request_url(self, path: str) -> Union[URL, str]:
+        """
+        Returns the URL for a rendered request path. Paths yarl would not
+        change become a yarl.URL built from parts; anything needing quoting,
+        percent-escape or dot-segment normalization is left to aiohttp as a
+        string, so the target sent is the same either way.
+        """
+        if (
+            self._build_encoded_urls
+            and "/." not in path
+            and ENCODED_TARGET_PATTERN.fullmatch(path)
+        ):
+            path, _, query = path.partition("?")
+            return URL.build(
+                scheme=self.original_scheme,
+                authority=self._base_netloc,
+                path=path,
+                query_string=query,
+                encoded=True,
+            )
+        return self.build_url(path)
+
     def match_path(self, request_path: str, pattern: str) -> bool:
         """
         Matches a request path against a pattern.
@@ -1282,83 +1642,190 @@ class TrafficGenerator:
         # If all segments matched (considering variables), the path matches the pattern
         return True
 
+    def _compile_templates(self):
+        """Fills _template_plans from the override headers and auth config."""
+        templates: List[str] = []
+        oh = self.site_map.path_headers_override
+        if oh and oh.headers:
+            templates.extend(oh.headers.values())
+        auth = self.site_map.auth
+        if auth:
+            templates.append(auth.auth_path)
+            creds = auth.credentials
+            if creds.header:
+                templates.extend(v for v in creds.header.dict().values() if v)
+            if creds.body_params:
+                templates.append(creds.body_params.username or "")
+                templates.append(creds.body_params.password or "")
+        for text in templates:
+            self._template_plans[text] = compile_template(text)
+
+    def _prepare_auth_headers(self, auth: AuthConfig) -> Optional[Dict[str, str]]:
+        """Returns the headers an auth type adds, or None if its credentials are missing."""
+        creds = auth.credentials
+        auth_type = auth.auth_type
+        if auth_type in ("basic", "bearer"):
+            # 'Authorization: Basic/Bearer ...' is directly in credentials.header
+            if creds.header and creds.header.Authorization:
+                return {"Authorization": creds.header.Authorization}
+            return None
+        if auth_type == "custom_header":
+            if creds.header:
+                return {k: v for k, v in creds.header.dict().items() if v is not None}
+            return None
+        if auth_type == "body_params":
+            if creds.body_params:
+                return {"Content-Type": "application/x-www-form-urlencoded"}
+            return None
+        if auth_type == "json_body":
+            if creds.json_body:
+                return {"Content-Type": "application/json"}
+            return None
+        if auth_type == "query_params":
+            # username/password for query_params are taken from body_params
+            return {} if creds.body_params else None
+        return {}
+
+    def _render_auth_query(self) -> str:
+        """Renders the query_params credentials, skipping empty values."""
+        rendered = [(key, self.replace_variables(v)) for key, v in self._auth_query]
+        return "&".join([f"{key}{quote(v)}" for key, v in rendered if v])
+
     def replace_variables(self, text: str) -> str:
         """Replaces @variable placeholders in text with values from sitemap.variables."""
-        if not self.site_map.variables or "@" not in text:
-            return text  # No variables defined or no placeholders found
-
-        modified_text = text
-        # Find all placeholders like @varname
-        placeholders = re.findall(r"@([a-zA-Z0-9_]+)", modified_text)
-
-        for var_name in placeholders:
-            placeholder = f"@{var_name}"
-            if var_name in self.site_map.variables:
-                var_def = self.site_map.variables[var_name]
-                value = None
-                try:
-                    if var_def.type == "range":
-                        # Ensure value is a list of two integers
-                        if (
-                            isinstance(var_def.value, list)
-                            and len(var_def.value) == 2
-                            and all(isinstance(x, int) for x in var_def.value)
-                        ):
-                            value = random.randint(var_def.value[0], var_def.value[1])
-                        else:
-                            logger.error(
-                                f"Invalid 'range' definition for variable @{var_name}: Expected list of two integers, got {var_def.value}"
-                            )
-                            continue  # Skip replacing this invalid variable
-                    elif var_def.type == "list":
-                        # Ensure value is a non-empty list
-                        if isinstance(var_def.value, list) and var_def.value:
-                            value = random.choice(var_def.value)
-                        else:
-                            logger.error(
-                                f"Invalid 'list' definition for variable @{var_name}: Expected non-empty list, got {var_def.value}"
-                            )
-                            continue  # Skip replacing this invalid variable
-                    else:
-                        # Should be caught by Pydantic validation, but belt-and-suspenders
-                        logger.error(
-                            f"Unsupported variable type '{var_def.type}' for @{var_name}"
-                        )
-                        continue
-
-                    # Convert value to string for replacement
-                    val_str = str(value)
-
-                    # URL-encode the value if it contains characters that need encoding in a URL path segment
-                    # We check if the placeholder is likely part of a path/query vs body
-                    # Simple check: if it's not the only thing in the string, assume URL context?
-                    # A more robust solution might need context awareness.
-                    # For now, encode if it contains unsafe characters typically encoded in paths/queries.
-                    if re.search(r"[^a-zA-Z0-9._~-]", val_str):
-                        # Check if already percent-encoded
-                        if not re.match(r"%[0-9a-fA-F]{2}", val_str):
-                            encoded_val_str = quote(
-                                val_str, safe=""
-                            )  # Encode everything except null
-                            logger.debug(
-                                f"Variable @{var_name} value '{val_str}' URL-encoded to '{encoded_val_str}'"
-                            )
-                            val_str = encoded_val_str
+        if not self._needs_substitution:
+            return text
+        segments = self._template_plans.get(text)
+        if segments is None:
+            if "@" not in text:
+                return text  # No variables defined or no placeholders found
+            segments = compile_template(text)
+            # Texts outside the sitemap are memoized too, up to a bound
+            if len(self._template_plans) < TEMPLATE_PLAN_CACHE_SIZE:
+                self._template_plans[text] = segments
+        return self.render_template(segments)
+
+    def render_template(
+        self,
+        segments: Tuple[str, ...],
+        escape: Optional[Callable[[str], str]] = None,
+        fields: FrozenSet[int] = frozenset(),
+    ) -> str:
+        """
+        Renders a compile_template() result, drawing each variable once.
+        escape, if given, is applied to every substituted value. fields, if
+        given, holds the variable indexes where a new JSON string starts;
+        variables are drawn again from each of them.
+        """
+        if len(segments) == 1:
+            return segments[0]  # No placeholders
+
+        variables = self.site_map.variables
+        drawers = self._var_drawers
+        parts = list(segments)
+        values: Dict[str, str] = {}
+        for i in range(1, len(parts), 2):
+            var_name = parts[i]
+            if fields and i in fields:
+                values.clear()
+            if var_name not in values:
+                draw = drawers.get(var_name)
+                if draw is not None:
+                    value = draw()
+                elif not variables:
+                    # Without any variables defined placeholders are left as-is
+                    value = f"@{var_name}"
+                else:
+                    value = self._variable_value(var_name)
+                values[var_name] = value if escape is None else escape(value)
+            parts[i] = values[var_name]
+        return "".join(parts)
+
+    def _variable_value(self, var_name: str) -> str:
+        """
+        Draws a rendered value for @var_name. Undefined or invalid variables
+        render as the original placeholder.
+        """
+        placeholder = f"@{var_name}"
+        var_def = self.site_map.variables.get(var_name)
+        if var_def is None:
+            logger.warning(
+                f"Placeholder {placeholder} found in template, but variable '@{var_name}' is not defined in sitemap.variables."
+            )
+            return placeholder
 
-                    # Replace all occurrences of the placeholder
-                    modified_text = modified_text.replace(placeholder, val_str)
+        rendered = self._list_values.get(var_name)
+        if rendered is not None:
+            return random.choice(rendered)
 
-                except Exception as e:
-                    logger.error(f"Error processing variable @{var_name}: {e}")
+        value = None
+        try:
+            if var_def.type == "range":
+                # Ensure value is a list of two integers
+                if (
+                    isinstance(var_def.value, list)
+                    and len(var_def.value) == 2
+                    and all(isinstance(x, int) for x in var_def.value)
+                ):
+                    value = random.randint(var_def.value[0], var_def.value[1])
+                else:
+                    logger.error(
+                        f"Invalid 'range' definition for variable @{var_name}: Expected list of two integers, got {var_def.value}"
+                    )
+                    return placeholder  # Skip replacing this invalid variable
+            elif var_def.type == "list":
+                # Ensure value is a non-empty list
+                if isinstance(var_def.value, list) and var_def.value:
+                    value = random.choice(var_def.value)
+                else:
+                    logger.error(
+                        f"Invalid 'list' definition for variable @{var_name}: Expected non-empty list, got {var_def.value}"
+                    )
+                    return placeholder  # Skip replacing this invalid variable
             else:
-                logger.warning(
-                    f"Placeholder {placeholder} found in template, but variable '@{var_name}' is not defined in sitemap.variables."
+                # Should be caught by Pydantic validation, but belt-and-suspenders
+                logger.error(
+                    f"Unsupported variable type '{var_def.type}' for @{var_name}"
                 )
+                return placeholder
+
+            # Convert value to string for replacement
+            return self._encode_value(var_name, str(value))
 
-        return modified_text
+        except Exception as e:
+            logger.error(f"Error processing variable @{var_name}: {e}")
+            return placeholder
+
+    def _encode_value(self, var_name: str, val_str: str) -> str:
+        """URL-encodes a variable value if it holds unsafe characters."""
+        # URL-encode the value if it contains characters that need encoding in a URL path segment
+        # We check if the placeholder is likely part of a path/query vs body
+        # Simple check: if it's not the only thing in the string, assume URL context?
+        # A more robust solution might need context awareness.
+        # For now, encode if it contains unsafe characters typically encoded in paths/queries.
+        if URL_UNSAFE_PATTERN.search(val_str):
+            # Check if already percent-encoded
+            if not PERCENT_ENCODED_PATTERN.match(val_str):
+                encoded_val_str = quote(
+                    val_str, safe=""
+                )  # Encode everything except null
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "Variable @%s value '%s' URL-encoded to '%s'",
+                        var_name,
+                        val_str,
+                        encoded_val_str,
+                    )
+                val_str = encoded_val_str
+        return val_str
 
     def _replace_variables_in_dict(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Recursively replaces variables in dictionary values."""
+        """
+        Recursively replaces variables in dictionary values. Reference and
+        compatibility API only: requests render precompiled templates instead.
+        """
+        if not self._needs_substitution:
+            return data
         new_dict = {}
         for key, value in data.items():
             if isinstance(value, dict):
@@ -1374,7 +1841,9 @@ class TrafficGenerator:
         return new_dict
 
     def _replace_variables_in_list(self, data: List[Any]) -> List[Any]:
-        """Recursively replaces variables in list elements."""
+        """Recursively replaces variables in list elements (see the dict walker)."""
+        if not self._needs_substitution:
+            return data
         new_list = []
         for item in data:
             if isinstance(item, dict):
@@ -1389,33 +1858,8 @@ class TrafficGenerator:
 
     def generate_random_ip(self) -> str:
         """Generates a random public IPv4 address."""
-        while True:
-            # Generate octets ensuring the IP is likely public
-            first_octet = random.randint(1, 223)
-            # Avoid common private ranges early
-            if first_octet == 10 or first_octet == 127:
-                continue
-            if first_octet == 172:
-                second_octet = random.randint(0, 255)
-                if 16 <= second_octet <= 31:
-                    continue  # Skip 172.16.0.0/12
-            elif first_octet == 192:
-                second_octet = random.randint(0, 255)
-                if second_octet == 168:
-                    continue  # Skip 192.168.0.0/16
-            elif first_octet == 100:
-                second_octet = random.randint(0, 255)
-                if 64 <= second_octet <= 127:
-                    continue  # Skip 100.64.0.0/10 (Shared Address Space)
-            elif first_octet == 169:
-                second_octet = random.randint(0, 255)
-                if second_octet == 254:
-                    continue  # Skip 169.254.0.0/16 (Link-local)
-            else:
-                second_octet = random.randint(0, 255)
-
-            third_octet = random.randint(0, 255)
-            fourth_octet = random.randint(1, 254)  # Avoid .0 and .255 for host part
-
-            # Construct and return the IP
-            return f"{first_octet}.{second_octet}.{third_octet}.{fourth_octet}"
+        block, host = divmod(random.randrange(FAKE_IP_TOTAL), FAKE_IP_HOSTS_PER_BLOCK)
+        run = bisect.bisect_right(FAKE_IP_BLOCK_OFFSETS, block) - 1
+        prefix = FAKE_IP_BLOCK_STARTS[run] + block - FAKE_IP_BLOCK_OFFSETS[run]
+        # Avoid .0 and .255 for the host part
+        return socket.inet_ntoa(struct.pack("!I", (prefix << 8) | (host + 1)))
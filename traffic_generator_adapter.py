@@ -4,12 +4,87 @@ Traffic Generator Adapter for Container Control Core v2.0.
 
 from __future__ import annotations
 import asyncio
+import os
 import threading
 import resource
-from typing import Any, Dict, Optional, List
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, List, NamedTuple
+
+try:
+    # Shipped with uvicorn[standard] (not on Windows); the stdlib loop is the fallback
+    import uvloop
+except ImportError:
+    uvloop = None
 
 from app_adapter import ApplicationAdapter
-from traffic_generator import StartRequest, TrafficGenerator, Metrics, logger
+from traffic_generator import (
+    ContainerConfig,
+    StartRequest,
+    TrafficGenerator,
+    Metrics,
+    logger,
+)
+
+
+class MetricsSnapshot(NamedTuple):
+    """Point-in-time generator values rendered by get_metrics() and prometheus_metrics()."""
+
+    running: bool
+    rps: float
+    config: Optional[ContainerConfig]
+
+
+# One long-lived background loop thread serves every adapter in the process;
+# each adapter only runs its own job dispatcher on it.
+_shared_loop: Optional[asyncio.AbstractEventLoop] = None
+_shared_thread: Optional[threading.Thread] = None
+_shared_loop_lock = threading.Lock()
+
+
+def _get_shared_loop() -> tuple[asyncio.AbstractEventLoop, threading.Thread]:
+    """Return the shared background loop and its thread, starting them on first use."""
+    global _shared_thread
+    with _shared_loop_lock:
+        if _shared_loop is None or not (_shared_thread and _shared_thread.is_alive()):
+            ready = threading.Event()
+            _shared_thread = threading.Thread(
+                target=_run_shared_loop,
+                args=(ready,),
+                name="traffic-generator-loop",
+                daemon=True,
+            )
+            _shared_thread.start()
+            ready.wait()
+            if _shared_loop is None:
+                raise RuntimeError("Traffic generator event loop failed to start")
+        return _shared_loop, _shared_thread
+
+
+def _run_shared_loop(ready: threading.Event) -> None:
+    """
+    Run the shared background event loop. The asyncio.Runner owns the loop,
+    so it is always closed if the thread ever exits. uvloop is used when it
+    is installed.
+    """
+    global _shared_loop
+    loop_factory = uvloop.new_event_loop if uvloop is not None else None
+    try:
+        with asyncio.Runner(loop_factory=loop_factory) as runner:
+            runner.run(_serve_shared_loop(ready))
+    except Exception as e:
+        logger.error(f"Background traffic generator error: {e}")
+    finally:
+        _shared_loop = None
+        ready.set()  # Never leave _get_shared_loop waiting
+        logger.info("Background traffic generator thread exiting.")
+
+
+async def _serve_shared_loop(ready: threading.Event) -> None:
+    """Publish the running loop, then keep it alive for the process lifetime."""
+    global _shared_loop
+    _shared_loop = asyncio.get_running_loop()
+    ready.set()
+    await asyncio.Event().wait()
 
 
 class TrafficGeneratorAdapter(ApplicationAdapter):
@@ -18,21 +93,33 @@ class TrafficGeneratorAdapter(ApplicationAdapter):
     Uses the existing traffic_generator.py implementation with minimal changes.
     Includes all capabilities from the original container_control.py.
     """
-    
+
     # Memory limits (matching original container_control.py)
     MEMORY_SOFT_LIMIT = 4096  # 4GB
     MEMORY_HARD_LIMIT = 4608  # 4.5GB
-    
+
+    # cgroup v2 unified hierarchy mount point
+    CGROUP_ROOT = "/sys/fs/cgroup"
+
+    # Every outbound connection holds an fd; NPROC catches runaway thread creation
+    OPEN_FILES_LIMIT = 65536
+    PROCESS_LIMIT = 4096
+
     def __init__(self, static_cfg: Dict[str, Any] | None = None) -> None:
         super().__init__(static_cfg)
         self.traffic_generator: Optional[TrafficGenerator] = None
         self.metrics: Optional[Metrics] = None
         self.event_loop: Optional[asyncio.AbstractEventLoop] = None
+        # The process-wide loop thread, reused across start/stop cycles
         self.background_thread: Optional[threading.Thread] = None
+        self._jobs: Optional[asyncio.Queue] = None
+        self._dispatcher: Optional[Future] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._job_done: Optional[threading.Event] = None
         self._loop_running = False
-        
-        # Set memory limits during initialization (like original)
-        self._set_memory_limits()
+
+        # Set process limits during initialization (like original)
+        self._set_process_limits()
 
     def start(self, start_payload: Dict[str, Any], *, ensure_user) -> Any:
         """
@@ -40,17 +127,20 @@ class TrafficGeneratorAdapter(ApplicationAdapter):
         Returns the background thread handle for the core to track.
         """
         logger.info("Starting traffic generator...")
-        
+
         # Stop any existing instance first (matching original behavior)
         if self._loop_running:
-            logger.info("Stopping existing traffic generator before starting new one...")
+            logger.info(
+                "Stopping existing traffic generator before starting new one..."
+            )
             self.stop()
-        
+
         # Validate and parse the payload
         try:
-            # Transform payload to match StartRequest structure if needed
+            # Transform payload to match StartRequest structure if needed, then
+            # validate the dict in a single pydantic-core pass
             processed_payload = self._process_payload(start_payload)
-            start_request = StartRequest(**processed_payload)
+            start_request = StartRequest.model_validate(processed_payload)
         except Exception as e:
             logger.error(f"Failed to parse start payload: {e}")
             raise
@@ -62,16 +152,19 @@ class TrafficGeneratorAdapter(ApplicationAdapter):
         self.traffic_generator = TrafficGenerator(
             config=start_request.config,
             site_map=start_request.sitemap,
-            metrics=self.metrics
+            metrics=self.metrics,
         )
 
-        # Start the traffic generator in a background thread with its own event loop
+        # Hand the generator to the background loop thread. Jobs run one at a
+        # time, so a restart never overlaps the previous run's shutdown.
+        self._ensure_background_loop()
         self._loop_running = True
-        self.background_thread = threading.Thread(
-            target=self._run_traffic_loop,
-            daemon=True
+        self._stop_event = asyncio.Event()
+        self._job_done = threading.Event()
+        self.event_loop.call_soon_threadsafe(
+            self._jobs.put_nowait,
+            (self.traffic_generator, self._stop_event, self._job_done),
         )
-        self.background_thread.start()
 
         logger.info("Traffic generator started successfully")
         return self.background_thread
@@ -83,7 +176,9 @@ class TrafficGeneratorAdapter(ApplicationAdapter):
             return
 
         logger.info("Stopping traffic generator...")
-        self._force_stop_traffic_generator(timeout=10)
+        # Don't block the caller: the loop thread finishes the shutdown, and a
+        # following start() queues behind it.
+        self._force_stop_traffic_generator(timeout=10, wait=False)
 
     def update(self, update_payload: Dict[str, Any]) -> bool:
         """
@@ -91,7 +186,7 @@ class TrafficGeneratorAdapter(ApplicationAdapter):
         Note: This requires stopping and restarting with new config.
         """
         logger.info("Updating traffic generator configuration...")
-        
+
         try:
             # For now, we'll do a restart with new config
             # In the future, this could be made more granular
@@ -105,37 +200,27 @@ class TrafficGeneratorAdapter(ApplicationAdapter):
 
     def get_metrics(self) -> Dict[str, Any]:
         """Return current traffic generator metrics (enhanced to match original detail level)."""
-        if not self.metrics or not self._loop_running:
+        snapshot = self._collect_snapshot()
+        if not snapshot.running:
             return {
                 "traffic_generator_status": "stopped",
                 "current_rps": 0,
                 "running": False,
-                "rps": 0.0  # Include for backward compatibility
+                "rps": 0.0,  # Include for backward compatibility
             }
 
         try:
-            # Get RPS from metrics in a thread-safe way (matching original cross-thread pattern)
-            current_rps = 0.0
-            if self.event_loop and not self.event_loop.is_closed():
-                try:
-                    future = asyncio.run_coroutine_threadsafe(
-                        self.metrics.get_rps(),
-                        self.event_loop
-                    )
-                    current_rps = float(future.result(timeout=3))  # Match original timeout
-                except Exception:
-                    current_rps = 0.0
-
+            config = snapshot.config
             return {
                 "traffic_generator_status": "running",
-                "current_rps": current_rps,
-                "running": self._loop_running,
-                "simulated_users": self.traffic_generator.config.sim_users if self.traffic_generator else 0,
-                "rate_limit": self.traffic_generator.config.rate_limit if self.traffic_generator else 0,
-                "target_url": self.traffic_generator.config.traffic_target_url if self.traffic_generator else "",
+                "current_rps": snapshot.rps,
+                "running": True,
+                "simulated_users": config.sim_users if config else 0,
+                "rate_limit": config.rate_limit if config else 0,
+                "target_url": config.traffic_target_url if config else "",
                 # Include legacy metric names for compatibility
-                "rps": current_rps,
-                "metrics": {"rps": current_rps}
+                "rps": snapshot.rps,
+                "metrics": {"rps": snapshot.rps},
             }
         except Exception as e:
             logger.error(f"Error getting metrics: {e}")
@@ -144,64 +229,169 @@ class TrafficGeneratorAdapter(ApplicationAdapter):
                 "current_rps": 0,
                 "running": False,
                 "error": str(e),
-                "rps": 0.0
+                "rps": 0.0,
             }
 
     def prometheus_metrics(self) -> List[str]:
         """
         Return Prometheus-format metrics (matching original container_control.py format).
         """
-        lines = []
-        
-        # Get current RPS
-        current_rps = 0.0
-        if self.metrics and self._loop_running and self.event_loop and not self.event_loop.is_closed():
-            try:
-                future = asyncio.run_coroutine_threadsafe(
-                    self.metrics.get_rps(),
-                    self.event_loop
-                )
-                current_rps = float(future.result(timeout=1))
-            except Exception:
-                current_rps = 0.0
-
-        # Traffic Generator specific metrics (matching original format)
-        lines.extend([
+        snapshot = self._collect_snapshot()
+        current_rps = snapshot.rps
+
+        # Traffic Generator specific metrics (matching original format).
+        # HELP/TYPE lines are static constants; only the sample values are formatted.
+        if not snapshot.config:
+            return [
+                "# HELP traffic_generator_rps Current requests-per-second.",
+                "# TYPE traffic_generator_rps gauge",
+                "traffic_generator_rps %s" % current_rps,
+                "# HELP container_rps Current requests-per-second (legacy name).",
+                "# TYPE container_rps gauge",
+                "container_rps %s" % current_rps,
+            ]
+
+        config = snapshot.config
+        return [
             "# HELP traffic_generator_rps Current requests-per-second.",
             "# TYPE traffic_generator_rps gauge",
-            f"traffic_generator_rps {current_rps}",
+            "traffic_generator_rps %s" % current_rps,
             "# HELP container_rps Current requests-per-second (legacy name).",
-            "# TYPE container_rps gauge", 
-            f"container_rps {current_rps}",
-        ])
-        
-        # Add traffic generator specific info
-        if self.traffic_generator:
-            lines.extend([
-                "# HELP traffic_generator_simulated_users Number of simulated users.",
-                "# TYPE traffic_generator_simulated_users gauge",
-                f"traffic_generator_simulated_users {self.traffic_generator.config.sim_users}",
-                "# HELP traffic_generator_rate_limit Rate limit setting.",
-                "# TYPE traffic_generator_rate_limit gauge",
-                f"traffic_generator_rate_limit {self.traffic_generator.config.rate_limit}",
-            ])
-
-        return lines
+            "# TYPE container_rps gauge",
+            "container_rps %s" % current_rps,
+            "# HELP traffic_generator_simulated_users Number of simulated users.",
+            "# TYPE traffic_generator_simulated_users gauge",
+            "traffic_generator_simulated_users %s" % config.sim_users,
+            "# HELP traffic_generator_rate_limit Rate limit setting.",
+            "# TYPE traffic_generator_rate_limit gauge",
+            "traffic_generator_rate_limit %s" % config.rate_limit,
+        ]
+
+    def _collect_snapshot(self) -> MetricsSnapshot:
+        """
+        Read the generator state once for both metrics formats. stop() may
+        clear the attributes from another thread, so each is read a single time.
+        """
+        metrics = self.metrics
+        traffic_generator = self.traffic_generator
+        running = self._loop_running and metrics is not None
+        return MetricsSnapshot(
+            running=running,
+            rps=float(metrics.last_rps) if running else 0.0,
+            config=traffic_generator.config if traffic_generator else None,
+        )
+
+    def _set_process_limits(self) -> None:
+        """Set memory, open-file and process-count limits for the container process."""
+        self._set_memory_limits()
+        # Only ever raise the fd limit; a higher inherited limit is kept
+        self._set_soft_limit(
+            resource.RLIMIT_NOFILE, "Open files", self.OPEN_FILES_LIMIT, raise_only=True
+        )
+        # RLIMIT_NPROC counts every process of the UID host-wide, so only cap
+        # an unlimited soft limit; any finite inherited limit is kept as-is
+        self._set_soft_limit(
+            resource.RLIMIT_NPROC, "Process", self.PROCESS_LIMIT, unlimited_only=True
+        )
+
+    def _set_soft_limit(
+        self,
+        limit: int,
+        name: str,
+        target: int,
+        raise_only: bool = False,
+        unlimited_only: bool = False,
+    ) -> None:
+        """
+        Set a soft resource limit to target, capped at the hard limit.
+        raise_only keeps a higher current limit; unlimited_only keeps any
+        finite current limit.
+        """
+        try:
+            soft, hard = resource.getrlimit(limit)
+            new_soft = target if hard == resource.RLIM_INFINITY else min(target, hard)
+            if raise_only and (soft == resource.RLIM_INFINITY or soft >= new_soft):
+                new_soft = soft
+            elif unlimited_only and soft != resource.RLIM_INFINITY:
+                new_soft = soft
+            else:
+                resource.setrlimit(limit, (new_soft, hard))
+            logger.info(f"{name} limit set: Soft={new_soft}, Hard={hard}")
+        except Exception as e:
+            logger.error(f"Failed to set {name.lower()} limit: {e}")
 
     def _set_memory_limits(self) -> None:
-        """Set memory limits for the container process (matching original container_control.py)."""
+        """
+        Cap memory with cgroup v2 memory.high (soft) and memory.max (hard) when
+        the container's cgroup allows it, else with a soft RLIMIT_DATA.
+        """
+        MB = 1024 * 1024
+        if self._set_cgroup_memory_limits(
+            self.MEMORY_SOFT_LIMIT * MB, self.MEMORY_HARD_LIMIT * MB
+        ):
+            return
+        # RLIMIT_DATA counts private writable mappings (heap, anonymous mmaps,
+        # thread stacks). Unlike RLIMIT_AS it skips file-backed read-only
+        # mappings such as shared libraries and PROT_NONE reservations like
+        # the unused part of glibc's malloc arenas.
+        self._set_soft_limit(
+            resource.RLIMIT_DATA, "Memory", self.MEMORY_SOFT_LIMIT * MB
+        )
+
+    def _set_cgroup_memory_limits(self, high: int, maximum: int) -> bool:
+        """
+        Lower this process's cgroup v2 memory.high/memory.max to the given byte
+        values, keeping any tighter limit already set. Returns True only once
+        both are in place; a partial write is rolled back and False returned,
+        as it is when cgroup v2 memory control is unavailable.
+        """
         MB = 1024 * 1024
         try:
-            soft, hard = resource.getrlimit(resource.RLIMIT_AS)
-            new_soft = min(self.MEMORY_SOFT_LIMIT * MB, hard)
-            resource.setrlimit(resource.RLIMIT_AS, (new_soft, hard))
-            logger.info(f"Memory limits set: Soft={new_soft / MB}MB, Hard={hard / MB}MB")
-        except Exception as e:
-            logger.error(f"Failed to set memory limits: {e}")
+            with open("/proc/self/cgroup") as f:
+                # The unified hierarchy entry is '0::<path>'
+                cgroup = next(line[3:].strip() for line in f if line.startswith("0::"))
+            cgroup_dir = os.path.join(self.CGROUP_ROOT, cgroup.lstrip("/"))
+            pending = []
+            # memory.high first: it throttles rather than OOM-kills
+            for name, value in (("memory.high", high), ("memory.max", maximum)):
+                path = os.path.join(cgroup_dir, name)
+                with open(path) as f:
+                    current = f.read().strip()
+                if current == "max" or int(current) > value:
+                    pending.append((path, current, value))
+        except (OSError, ValueError, StopIteration) as e:
+            logger.debug(f"cgroup v2 memory limits unavailable: {e}")
+            return False
+
+        written = []
+        try:
+            for path, current, value in pending:
+                with open(path, "w") as f:
+                    f.write(str(value))
+                written.append((path, current))
+        except OSError as e:
+            logger.debug(f"cgroup v2 memory limits not writable: {e}")
+            # Undo a half-applied limit so only the RLIMIT fallback applies
+            for path, previous in written:
+                try:
+                    with open(path, "w") as f:
+                        f.write(previous)
+                except OSError as restore_error:
+                    logger.error(f"Failed to restore {path}: {restore_error}")
+            return False
+
+        logger.info(
+            f"Memory limits set (cgroup v2): High={high / MB}MB, Max={maximum / MB}MB"
+        )
+        return True
 
-    def _force_stop_traffic_generator(self, timeout: int = 10) -> None:
+    def _force_stop_traffic_generator(
+        self, timeout: int = 10, wait: bool = True
+    ) -> None:
         """
         Aggressively stop any running traffic generator (matching original force_stop logic).
+        With wait=False the stop is only scheduled; callers that need the
+        generator fully torn down pass wait=True and block up to timeout.
         """
         if not self._loop_running:
             return
@@ -210,114 +400,104 @@ class TrafficGeneratorAdapter(ApplicationAdapter):
         self._loop_running = False
 
         try:
-            # Stop the traffic generator if it exists and event loop is running
-            if self.event_loop and self.traffic_generator and not self.event_loop.is_closed():
-                if self.traffic_generator.running:
-                    future = asyncio.run_coroutine_threadsafe(
-                        self.traffic_generator.stop_generating(),
-                        self.event_loop
-                    )
-                    try:
-                        future.result(timeout=timeout)
-                    except Exception as e:
-                        logger.error(f"Stop coroutine failed or timed out: {e}")
-
-                # Stop the event loop
-                self.event_loop.call_soon_threadsafe(self.event_loop.stop)
+            # Wake the running job; it stops the generator and the loop thread
+            # goes back to waiting for the next job.
+            if self.event_loop and self._stop_event:
+                self.event_loop.call_soon_threadsafe(self._stop_event.set)
+        except RuntimeError as e:
+            # Loop already closed: the thread is exiting on its own
+            logger.debug(f"Event loop already closed while stopping: {e}")
         except Exception as e:
             logger.error(f"Error while stopping event loop: {e}")
         finally:
-            # Wait for background thread to finish
-            if self.background_thread and self.background_thread.is_alive():
-                self.background_thread.join(timeout=timeout)
-                if self.background_thread.is_alive():
-                    logger.warning("Background thread did not terminate cleanly")
-
-            # Clean up (matching original cleanup)
-            if self.event_loop and not self.event_loop.is_closed():
-                try:
-                    self.event_loop.close()
-                except Exception as e:
-                    logger.error(f"Error closing event loop: {e}")
+            # Wait for the job to finish, but only if the caller asked to
+            if wait and self._job_done and not self._job_done.wait(timeout=timeout):
+                logger.warning("Traffic generator did not stop within timeout")
 
             self.traffic_generator = None
             self.metrics = None
-            self.event_loop = None
-            self.background_thread = None
-            
-            logger.info("Traffic generator force stopped")
+            self._stop_event = None
+            self._job_done = None
 
-    def _run_traffic_loop(self) -> None:
-        """
-        Run the traffic generator in its own event loop in a background thread.
-        Enhanced with better error handling matching the original.
-        """
-        try:
-            # Create new event loop for this thread
-            self.event_loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(self.event_loop)
-            
-            logger.info("Starting traffic generation in background thread...")
-            
-            # Start the traffic generator
-            self.event_loop.run_until_complete(
-                self.traffic_generator.start_generating()
+            logger.info(
+                "Traffic generator force stopped"
+                if wait
+                else "Traffic generator stop scheduled"
             )
 
-            # Keep the loop running until we're told to stop
-            # Use a more responsive sleep interval for better shutdown
-            while self._loop_running:
-                self.event_loop.run_until_complete(asyncio.sleep(0.1))
+    def _ensure_background_loop(self) -> None:
+        """Start this adapter's job dispatcher on the shared loop on first use."""
+        loop, thread = _get_shared_loop()
+        if self.event_loop is loop and self._dispatcher and not self._dispatcher.done():
+            return
+
+        self.event_loop = loop
+        self.background_thread = thread
+        # asyncio.Queue binds to a loop on first use, so it can be built here
+        self._jobs = asyncio.Queue()
+        self._dispatcher = asyncio.run_coroutine_threadsafe(
+            self._dispatch_jobs(self._jobs), loop
+        )
+
+    async def _dispatch_jobs(self, jobs: asyncio.Queue) -> None:
+        """Serve queued (generator, stop_event, done) jobs one after another."""
+        while True:
+            traffic_generator, stop_event, done = await jobs.get()
+            try:
+                await self._serve_traffic_generator(traffic_generator, stop_event)
+            except Exception as e:
+                logger.error(f"Background traffic generator error: {e}")
+            finally:
+                done.set()
+
+    async def _serve_traffic_generator(
+        self, traffic_generator: TrafficGenerator, stop_event: asyncio.Event
+    ) -> None:
+        """Start generating, then park until the stop event is set."""
+        if stop_event.is_set():
+            return  # Stopped before it got the chance to start
 
+        logger.info("Starting traffic generation in background thread...")
+        try:
+            await traffic_generator.start_generating()
+            await stop_event.wait()
         except asyncio.CancelledError:
             logger.info("Traffic generation cancelled.")
-        except Exception as e:
-            logger.error(f"Background traffic generator error: {e}")
+            raise
         finally:
-            logger.info("Background traffic generator thread exiting.")
-            # Clean up the event loop (matching original finally block)
-            if self.event_loop and not self.event_loop.is_closed():
-                try:
-                    # Stop any remaining tasks
-                    if self.traffic_generator:
-                        self.event_loop.run_until_complete(
-                            self.traffic_generator.stop_generating()
-                        )
-                    
-                    # Close the loop
-                    self.event_loop.close()
-                except Exception as e:
-                    logger.error(f"Error cleaning up event loop: {e}")
+            if traffic_generator.running:
+                await traffic_generator.stop_generating()
 
     def _process_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """
         Process the incoming payload to ensure it matches StartRequest structure.
         Uses the same logic as the original _ensure_config_sitemap_structure function.
         """
-        # Create a copy to avoid modifying the original
-        processed = payload.copy()
-        
-        # Handle sitemap extraction (exactly matching original logic)
-        sitemap = processed.pop("sitemap", None)
-        
-        # If no explicit config, move all non-sitemap keys into config
-        config = processed.get("config", {})
-        
-        # Move all leftover top-level keys into 'config'
-        for key in list(processed.keys()):
-            if key != "config" and key != "sitemap":
-                config[key] = processed.pop(key)
-        
-        processed["config"] = config
-        
+        # Already in StartRequest shape: nothing to fold or unwrap
+        sitemap = payload.get("sitemap")
+        if (
+            payload.keys() <= {"config", "sitemap"}
+            and payload.get("config") is not None
+            and not (
+                isinstance(sitemap, dict) and isinstance(sitemap.get("sitemap"), dict)
+            )
+        ):
+            return payload
+
+        # Classify the top-level keys in one pass: everything that is not
+        # 'config' or 'sitemap' is folded into config (exactly matching original logic)
+        config = payload.get("config") or {}
+        config.update(
+            {k: v for k, v in payload.items() if k != "config" and k != "sitemap"}
+        )
+        processed = {"config": config}
+
         if sitemap is not None:
             # Support newer payload format where sitemap may include metadata under a nested 'sitemap' key
             # (exactly matching original logic)
-            if (isinstance(sitemap, dict) and 
-                "sitemap" in sitemap and 
-                isinstance(sitemap["sitemap"], dict)):
+            if isinstance(sitemap, dict) and isinstance(sitemap.get("sitemap"), dict):
                 processed["sitemap"] = sitemap["sitemap"]
             else:
                 processed["sitemap"] = sitemap
-        
+
         return processed